@@ -0,0 +1,223 @@
+# Busca aproximada por nome de prato: ignora acentos, maiúsculas e pequenos erros de digitação.
+# As chaves normalizadas e o índice de trigramas são montados uma vez (na carga e a cada prato novo);
+# na consulta, os trigramas selecionam poucos candidatos e só eles passam pela distância de edição.
+
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any, Tuple, Set, Optional
+# Contagem de trigramas em comum entre a consulta e cada prato
+from collections import Counter
+# Para medir o tempo gasto e respeitar o orçamento de latência
+import time
+# Para remover acentos (decomposição Unicode)
+import unicodedata
+# Para trocar pontuação por espaços
+import re
+
+
+# Tempo máximo (em milissegundos) gasto verificando candidatos em uma consulta
+ORCAMENTO_PADRAO_MS = 50.0
+
+# Máximo de ocorrências de trigramas contadas ao escolher os candidatos aproximados
+# Os trigramas mais raros são contados primeiro; os muito comuns (ex.: " de") ficam de fora quando estouram o limite
+ORCAMENTO_CONTAGEM = 200_000
+
+# Qualquer sequência que não seja letra ou número vira um espaço
+_SEPARADORES = re.compile(r"[^0-9a-z]+")
+
+
+# Normaliza um texto: remove acentos, ignora maiúsculas/minúsculas e pontuação ("Pão-de-Queijo" -> "pao de queijo")
+def normalizar(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _SEPARADORES.sub(" ", sem_acentos.casefold()).strip()
+
+
+# Gera os trigramas de um texto normalizado, com um espaço de cada lado para marcar início e fim
+def trigramas(texto: str) -> Set[str]:
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+# Máscaras de bits da consulta para a distância de edição bit a bit: caractere -> posições onde ele aparece
+def mascaras_de_bits(consulta: str) -> Dict[str, int]:
+    mascaras: Dict[str, int] = {}
+    for i, c in enumerate(consulta):
+        mascaras[c] = mascaras.get(c, 0) | (1 << i)
+    return mascaras
+
+
+# Distância de Levenshtein (algoritmo bit a bit de Myers/Hyyrö): processa um caractere do texto por vez
+# usando inteiros como vetores de bits, em vez de preencher a matriz inteira de programação dinâmica
+# Retorna limite + 1 quando a distância passa de 'limite'
+def levenshtein_limitado(consulta: str, texto: str, limite: int, mascaras: Dict[str, int] = None) -> int:
+    if abs(len(consulta) - len(texto)) > limite:
+        return limite + 1
+    if not consulta or not texto:
+        return max(len(consulta), len(texto))
+    if mascaras is None:
+        mascaras = mascaras_de_bits(consulta)
+
+    m = len(consulta)
+    todos = (1 << m) - 1
+    ultimo_bit = 1 << (m - 1)
+    positivos, negativos, distancia = todos, 0, m
+    for c in texto:
+        iguais = mascaras.get(c, 0)
+        xv = iguais | negativos
+        xh = (((iguais & positivos) + positivos) ^ positivos) | iguais
+        ph = (negativos | ~(xh | positivos)) & todos
+        mh = positivos & xh
+        if ph & ultimo_bit:
+            distancia += 1
+        elif mh & ultimo_bit:
+            distancia -= 1
+        ph = ((ph << 1) | 1) & todos
+        mh = (mh << 1) & todos
+        positivos = (mh | ~(xv | ph)) & todos
+        negativos = ph & xv
+    return distancia if distancia <= limite else limite + 1
+
+
+# Erros de digitação tolerados para uma consulta de determinado tamanho
+def erros_tolerados(tamanho: int) -> int:
+    if tamanho <= 3:
+        return 0
+    if tamanho <= 6:
+        return 1
+    return max(2, tamanho // 4)
+
+
+# Calcula a nota (0 a 1) de um nome para a consulta, ou None se estiver longe demais
+def pontuar(consulta: str, chave: str, limite: int) -> Optional[float]:
+    # Trecho exato do nome: nota máxima se começa em início de palavra, um pouco menor se no meio
+    posicao = chave.find(consulta)
+    if posicao == 0 or (posicao > 0 and chave[posicao - 1] == " "):
+        return 1.0
+    if posicao > 0:
+        return 0.95
+
+    # Compara a consulta com janelas de palavras do nome do mesmo tamanho (e uma palavra a mais ou a menos)
+    palavras = chave.split()
+    qtd = len(consulta.split())
+    mascaras = mascaras_de_bits(consulta)
+    melhor = limite + 1
+    for tamanho_janela in {max(1, qtd - 1), qtd, qtd + 1}:
+        for inicio in range(max(1, len(palavras) - tamanho_janela + 1)):
+            trecho = " ".join(palavras[inicio:inicio + tamanho_janela])
+            melhor = min(melhor, levenshtein_limitado(consulta, trecho, limite, mascaras))
+    if melhor > limite:
+        return None
+    return 0.9 * (1 - melhor / max(len(consulta), 1))
+
+
+# Índice de busca aproximada sobre os pratos do cardápio
+class IndiceBusca:
+    def __init__(self, itens: List[Dict[str, Any]] = ()):
+        self.itens: Dict[int, Dict[str, Any]] = {}     # id -> prato
+        self.chaves: Dict[int, str] = {}                # id -> nome normalizado (pré-calculado)
+        self.postings: Dict[str, Set[int]] = {}         # trigrama -> ids dos pratos que o contêm
+        for item in itens:
+            self.adicionar(item)
+
+    # Indexa um prato (ou reindexa, se o id já existir)
+    def adicionar(self, item: Dict[str, Any]) -> None:
+        if item["id"] in self.itens:
+            self.remover(item["id"])
+        chave = normalizar(item["nome"])
+        self.itens[item["id"]] = item
+        self.chaves[item["id"]] = chave
+        for grama in trigramas(chave):
+            self.postings.setdefault(grama, set()).add(item["id"])
+
+    # Remove um prato do índice
+    def remover(self, item_id: int) -> None:
+        chave = self.chaves.pop(item_id, None)
+        self.itens.pop(item_id, None)
+        if chave is None:
+            return
+        for grama in trigramas(chave):
+            ids = self.postings.get(grama)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self.postings[grama]
+
+    # IDs de todos os pratos cujo nome normalizado contém a consulta como trecho exato
+    # Quem contém a consulta contém todos os trigramas internos dela: basta intersectar as listas, da menor para a maior
+    # A busca roda sem a trava do cardápio: alterações simultâneas podem tirar pratos do índice no meio dela
+    def _contendo(self, consulta: str) -> Set[int]:
+        internos = {consulta[i:i + 3] for i in range(len(consulta) - 2)}
+        if not internos:
+            # Consulta com menos de 3 caracteres: compara com todos os nomes, numa cópia (o dicionário pode mudar)
+            return {item_id for item_id, chave in list(self.chaves.items()) if consulta in chave}
+        listas = sorted((self.postings.get(grama, set()) for grama in internos), key=len)
+        candidatos = listas[0].intersection(*listas[1:])
+        return {item_id for item_id in candidatos if consulta in self.chaves.get(item_id, "")}
+
+    # Busca os pratos mais parecidos com a consulta, ordenados pela nota (maior primeiro)
+    # Retorna os pares (nota, prato) e se a busca foi interrompida (pode haver pratos aproximados não verificados)
+    # Pratos que contêm a consulta como trecho exato sempre entram; o orçamento de tempo vale só para a
+    # verificação dos candidatos aproximados, e conta a partir do momento em que eles já foram escolhidos
+    def buscar(self, consulta: str, categoria: str = None, orcamento_ms: float = ORCAMENTO_PADRAO_MS) -> Tuple[List[Tuple[float, Dict[str, Any]]], bool]:
+        consulta = normalizar(consulta)
+        if not consulta:
+            return [], False
+        limite = erros_tolerados(len(consulta))
+        categoria_normalizada = categoria.lower() if categoria else None
+        resultados: List[Tuple[float, Dict[str, Any]]] = []
+
+        def avaliar(item_id: int) -> None:
+            # Prato removido (ou em reindexação) depois de escolhido como candidato: fica de fora
+            item = self.itens.get(item_id)
+            chave = self.chaves.get(item_id)
+            if item is None or chave is None:
+                return
+            if categoria_normalizada and item["categoria"].lower() != categoria_normalizada:
+                return
+            nota = pontuar(consulta, chave, limite)
+            if nota is not None:
+                resultados.append((nota, item))
+
+        # Trechos exatos: completos, qualquer que seja o tamanho do cardápio
+        exatos = self._contendo(consulta)
+        for item_id in exatos:
+            avaliar(item_id)
+
+        # Candidatos aproximados: conta os trigramas em comum, dos mais raros para os mais comuns, até o orçamento
+        gramas = sorted(trigramas(consulta), key=lambda grama: len(self.postings.get(grama, ())))
+        usados = 0
+        volume = 0
+        for grama in gramas:
+            tamanho = len(self.postings.get(grama, ()))
+            if usados and volume + tamanho > ORCAMENTO_CONTAGEM:
+                break
+            usados += 1
+            volume += tamanho
+        ignorados = len(gramas) - usados
+        contagem: Counter = Counter()
+        for grama in gramas[:usados]:
+            contagem.update(self.postings.get(grama, ()))
+
+        # Cada erro de digitação destrói no máximo 3 trigramas, e os ignorados podem ser justamente os que
+        # sobraram em comum: quem tem menos que isso entre os contados não pode casar
+        minimo_teorico = len(gramas) - 3 * limite - ignorados
+        minimo_em_comum = max(1, minimo_teorico)
+        # Sem trigramas suficientes para filtrar, pratos que só têm em comum os ignorados não são vistos
+        truncado = ignorados > 0 and minimo_teorico < 1
+
+        # Agrupa os candidatos pela quantidade em comum (evita ordenar todos)
+        faixas: List[List[int]] = [[] for _ in range(usados + 1)]
+        for item_id, em_comum in contagem.items():
+            if em_comum >= minimo_em_comum and item_id not in exatos:
+                faixas[em_comum].append(item_id)
+
+        # Verifica primeiro os candidatos com mais trigramas em comum (os mais promissores)
+        prazo = time.perf_counter() + orcamento_ms / 1000
+        for item_id in (item_id for faixa in reversed(faixas) for item_id in faixa):
+            if time.perf_counter() > prazo:
+                truncado = True
+                break
+            avaliar(item_id)
+
+        resultados.sort(key=lambda r: (-r[0], r[1]["id"]))
+        return resultados, truncado
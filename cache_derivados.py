@@ -0,0 +1,111 @@
+# Cache em disco das estruturas derivadas dos dados (cardápio com índices, combos e estatísticas;
+# modelo de pratos semelhantes). Cada arquivo é identificado pelo hash do conteúdo dos dados e pelo
+# hash do código que monta a estrutura: se o CSV ou o código mudam, o nome muda e tudo é recalculado.
+# A gravação é atômica (arquivo temporário + rename): quem lê o cache nunca vê um arquivo pela metade,
+# mesmo com vários processos iniciando ao mesmo tempo.
+
+# Tipos genéricos para tipagem das funções
+from typing import Any, Callable
+# Para manipular caminhos de arquivo de modo portável
+from pathlib import Path
+# Hash do conteúdo dos dados e do código
+import hashlib
+# Localiza o arquivo-fonte dos módulos
+import importlib
+# Gravação atômica
+import os
+import tempfile
+# Serialização: pickle (implementação em C) para estruturas com muitos objetos Python pequenos,
+# joblib para modelos com arrays numpy grandes
+import pickle
+import joblib
+# Coletor de lixo desligado durante a leitura de arquivos com milhões de objetos
+import gc
+
+
+# Muda quando o formato dos arquivos de cache muda (invalida todos os arquivos gravados antes)
+VERSAO_FORMATO = 1
+
+# Tamanho de cada leitura ao calcular o hash de um arquivo
+TAMANHO_LEITURA = 1024 * 1024
+
+
+# Hash do conteúdo de um arquivo, lido em partes (não carrega o arquivo inteiro na memória)
+def hash_arquivo(caminho: Path) -> str:
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(TAMANHO_LEITURA), b""):
+            resumo.update(parte)
+    return resumo.hexdigest()
+
+
+# Hash do código-fonte dos módulos indicados (e de textos extras, como versões de bibliotecas)
+# Qualquer mudança nesses arquivos gera outro nome de arquivo de cache
+def hash_codigo(*modulos: str, extras: tuple = ()) -> str:
+    resumo = hashlib.sha256(f"formato {VERSAO_FORMATO}".encode("utf-8"))
+    for nome in modulos:
+        resumo.update(Path(importlib.import_module(nome).__file__).read_bytes())
+    for extra in extras:
+        resumo.update(str(extra).encode("utf-8"))
+    return resumo.hexdigest()
+
+
+# Lê um arquivo de cache; a extensão indica o formato ('.joblib' ou '.pickle')
+def ler(caminho: Path) -> Any:
+    if caminho.suffix == ".joblib":
+        return joblib.load(caminho)
+    # O coletor de lixo rodaria várias vezes enquanto os objetos são criados, sem nada para liberar
+    reativar = gc.isenabled()
+    gc.disable()
+    try:
+        with open(caminho, "rb") as f:
+            return pickle.load(f)
+    finally:
+        if reativar:
+            gc.enable()
+
+
+# Grava um objeto de forma atômica (arquivo temporário na mesma pasta + rename); formato conforme a extensão
+def gravar_atomico(objeto: Any, caminho: Path) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=caminho.name, suffix=".tmp")
+    try:
+        if caminho.suffix == ".joblib":
+            os.close(descritor)
+            joblib.dump(objeto, temporario)
+        else:
+            with os.fdopen(descritor, "wb") as f:
+                pickle.dump(objeto, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# Lê o objeto gravado em 'caminho' ou gera (e grava) um novo
+# 'antigos' é um padrão (glob) dos arquivos que este substitui: são apagados depois da gravação
+def carregar_ou_gerar(caminho: Path, gerar: Callable[[], Any], antigos: str = None) -> Any:
+    if caminho.exists():
+        try:
+            return ler(caminho)
+        except Exception as e:
+            # Arquivo corrompido ou gravado com outra versão das bibliotecas: gera de novo
+            print(f"Cache inválido em {caminho}: {e}")
+
+    objeto = gerar()
+    try:
+        gravar_atomico(objeto, caminho)
+    except OSError as e:
+        # Sem permissão ou sem espaço: segue sem cache
+        print(f"Não foi possível gravar o cache em {caminho}: {e}")
+        return objeto
+
+    if antigos:
+        for arquivo in caminho.parent.glob(antigos):
+            if arquivo != caminho:
+                try:
+                    arquivo.unlink()
+                except OSError:
+                    pass  # Outro processo já apagou (ou ainda está usando no Windows)
+    return objeto
@@ -0,0 +1,307 @@
+# Cardápio em memória com todas as estruturas derivadas (índices, combos e estatísticas).
+# Inclusões, alterações e remoções atualizam cada estrutura de forma incremental. Remoções deixam
+# uma "lápide" (None) na lista de pratos, o que é O(1); quando as lápides e os combos obsoletos
+# passam de um limite, uma compactação em segundo plano reconstrói as estruturas sem eles.
+
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any, Tuple, Iterator, Iterable, Optional, Deque, Callable, Hashable
+# Histórico circular de alterações (as mais antigas saem sozinhas)
+from collections import deque
+# Junta listas de combos já ordenadas sem precisar reordenar tudo
+import heapq
+# Identificador da instância do cardápio (as versões recomeçam do zero a cada carga)
+import uuid
+# Para percorrer só o fim do histórico
+from itertools import islice
+# Trava para as alterações e thread da compactação em segundo plano
+import threading
+# Índice de busca aproximada por nome
+from busca_aproximada import IndiceBusca
+# Estatísticas de preço por categoria
+from estatisticas import EstatisticasCardapio
+
+
+# Um combo é um par de pratos de categorias diferentes e o preço total
+Combo = Tuple[Dict[str, Any], Dict[str, Any], float]
+
+# Quantas alterações recentes ficam guardadas para a sincronização incremental
+TAMANHO_HISTORICO = 10000
+
+# Compacta quando as lápides passarem desta fração da lista de pratos (e deste mínimo absoluto)
+FRACAO_LAPIDES_COMPACTACAO = 0.2
+MINIMO_LAPIDES_COMPACTACAO = 64
+
+# Compacta quando os combos obsoletos ou os combos novos (fora da lista principal) passarem desta fração
+FRACAO_COMBOS_COMPACTACAO = 0.25
+MINIMO_COMBOS_COMPACTACAO = 1000
+
+
+# Inclusão de um prato com ID que já existe no cardápio
+class PratoDuplicado(ValueError):
+    pass
+
+
+# Chave de ordenação dos combos: preço total crescente, depois IDs para estabilidade
+def chave_combo(combo: Combo) -> Tuple[float, int, int]:
+    return (combo[2], combo[0]["id"], combo[1]["id"])
+
+
+# Monta o combo de dois pratos com o mais barato (por preço e id) sempre na primeira posição
+def montar_combo(x: Dict[str, Any], y: Dict[str, Any]) -> Combo:
+    if (y["preco"], y["id"]) < (x["preco"], x["id"]):
+        x, y = y, x
+    return (x, y, x["preco"] + y["preco"])
+
+
+# Função para gerar todos os combos possíveis com pratos de categorias diferentes
+def gerar_todos_combos(cardapio: List[Dict[str, Any]]) -> List[Combo]:
+    # Ordena os pratos por preço e id para garantir ordenação determinística
+    itens = sorted(cardapio, key=lambda x: (x["preco"], x["id"]))
+    combos: List[Combo] = []
+    n = len(itens)
+
+    # Percorre todos os pares possíveis de pratos (sem repetição)
+    for a in range(n):
+        for b in range(a + 1, n):
+            # Garante que os pratos tenham categorias diferentes para diversidade
+            if itens[a]["categoria"] != itens[b]["categoria"]:
+                # Calcula preço total do combo
+                total = itens[a]["preco"] + itens[b]["preco"]
+                # Adiciona o par e o total na lista de combos
+                combos.append((itens[a], itens[b], total))
+
+    # Ordena os combos pelo preço total crescente, depois pelo ID dos pratos para estabilidade
+    combos.sort(key=chave_combo)
+
+    # Retorna a lista completa de combos
+    return combos
+
+
+# Cardápio em memória e suas estruturas derivadas
+class Cardapio:
+    # 'derivados' são as estruturas já calculadas de uma carga anterior (ver derivados()); sem elas, tudo é calculado
+    def __init__(self, itens: Iterable[Dict[str, Any]] = (), derivados: Optional[Dict[str, Any]] = None):
+        # Serializa as alterações (as leituras não precisam da trava)
+        self.trava = threading.RLock()
+        if derivados is not None:
+            itens = derivados["itens"]  # Os combos apontam para estes mesmos dicionários
+        self.itens: List[Optional[Dict[str, Any]]] = list(itens)   # None marca um prato removido (lápide)
+        self.posicoes: Dict[int, int] = {item["id"]: i for i, item in enumerate(self.itens)}
+        self.indice_id: Dict[int, Dict[str, Any]] = {item["id"]: item for item in self.itens}
+        if derivados is not None:
+            self.indice_busca: IndiceBusca = derivados["indice_busca"]
+            self.estatisticas: EstatisticasCardapio = derivados["estatisticas"]
+            self.combos: List[Combo] = derivados["combos"]
+        else:
+            self.indice_busca = IndiceBusca(self.itens)
+            self.estatisticas = EstatisticasCardapio(self.itens)
+            self.combos = gerar_todos_combos(self.itens)   # Lista principal, ordenada
+        # Combos dos pratos incluídos/alterados depois da última compactação, em blocos ordenados (do maior
+        # para o menor); a leitura junta os blocos com a lista principal sob demanda
+        self.combos_novos: List[List[Combo]] = []
+        self.total_combos_novos = 0
+        self.lapides = 0                       # Pratos removidos ainda ocupando posição em self.itens
+        self.combos_obsoletos = 0              # Estimativa de combos que apontam para versões antigas dos pratos
+        self.versao = 0                        # Muda a cada alteração (invalida caches)
+        self.instancia = uuid.uuid4().hex      # Distingue as versões desta carga das de cargas anteriores
+        self.nome: Optional[str] = None        # Identifica o cardápio nos arquivos de cache (quando vem de um CSV)
+        # Histórico circular: (versão, tipo, id, prato) com tipo 'insercao', 'alteracao' ou 'remocao'
+        self.historico: Deque[Tuple[int, str, int, Optional[Dict[str, Any]]]] = deque(maxlen=TAMANHO_HISTORICO)
+        # Funções chamadas a cada alteração (ex.: o canal de eventos), com a trava ainda adquirida
+        self.ouvintes: List[Callable[[Dict[str, Any]], None]] = []
+        # Respostas já serializadas a partir deste cardápio (cada entrada guarda a versão em que foi gerada)
+        self.cache: Dict[Hashable, Any] = {}
+        self._compactando = False
+
+    # Estruturas derivadas dos pratos, para gravar em disco e reaproveitar na próxima carga
+    # Só faz sentido logo após a carga (sem alterações): pratos e combos são gravados juntos para
+    # que os combos continuem apontando para os mesmos dicionários dos pratos ao serem lidos
+    def derivados(self) -> Dict[str, Any]:
+        with self.trava:
+            if self.versao != 0:
+                raise RuntimeError("As estruturas derivadas só podem ser gravadas antes de qualquer alteração.")
+            return {
+                "itens": self.listar(),
+                "indice_busca": self.indice_busca,
+                "estatisticas": self.estatisticas,
+                "combos": self.combos,
+            }
+
+    # Quantidade de pratos ativos
+    def __len__(self) -> int:
+        return len(self.indice_id)
+
+    # Percorre os pratos ativos na ordem original, pulando as lápides
+    def ativos(self) -> Iterator[Dict[str, Any]]:
+        for item in self.itens:
+            if item is not None:
+                yield item
+
+    # Lista com os pratos ativos
+    def listar(self) -> List[Dict[str, Any]]:
+        return [item for item in self.itens if item is not None]
+
+    # Busca um prato pelo ID (ou None)
+    def obter(self, item_id: int) -> Optional[Dict[str, Any]]:
+        return self.indice_id.get(item_id)
+
+    # Um combo é válido se os dois pratos ainda são a versão atual (não foram removidos nem alterados)
+    def combo_valido(self, combo: Combo) -> bool:
+        return self.indice_id.get(combo[0]["id"]) is combo[0] and self.indice_id.get(combo[1]["id"]) is combo[1]
+
+    # Indica se há algum combo montado (válido ou não)
+    def tem_combos(self) -> bool:
+        return bool(self.combos or self.combos_novos)
+
+    # Percorre os combos válidos em ordem de preço, juntando a lista principal com os blocos de combos novos
+    def combos_validos(self) -> Iterator[Combo]:
+        for combo in heapq.merge(self.combos, *self.combos_novos, key=chave_combo):
+            if self.combo_valido(combo):
+                yield combo
+
+    # Registra uma alteração: nova versão e entrada no histórico (chamado com a trava)
+    def _registrar(self, tipo: str, item_id: int, item: Optional[Dict[str, Any]]) -> None:
+        self.versao += 1
+        self.historico.append((self.versao, tipo, item_id, item))
+        alteracao = {"instancia": self.instancia, "versao": self.versao, "tipo": tipo, "id": item_id, "prato": item}
+        # A alteração já foi aplicada: uma falha em um ouvinte é registrada, mas não desfaz nem falha a alteração
+        for ouvinte in list(self.ouvintes):
+            try:
+                ouvinte(alteracao)
+            except Exception as e:
+                print(f"Falha ao notificar a alteração {self.versao} ({tipo} do prato {item_id}): {e!r}")
+
+    # Alterações feitas depois de uma versão; retorna None se o histórico não cobre mais essa versão
+    # (o cliente então precisa baixar o cardápio inteiro de novo)
+    def alteracoes_desde(self, versao: int) -> Optional[List[Tuple[int, str, int, Optional[Dict[str, Any]]]]]:
+        with self.trava:
+            # Versão desconhecida (por exemplo, de antes de reiniciar o servidor)
+            if versao < 0 or versao > self.versao:
+                return None
+            if versao == self.versao:
+                return []
+            # Versão mais antiga ainda disponível; antes dela o histórico já foi descartado
+            primeira = self.historico[0][0] if self.historico else self.versao + 1
+            if versao < primeira - 1:
+                return None
+            # As versões são consecutivas: a posição no histórico sai direto da diferença
+            return list(islice(self.historico, versao - (primeira - 1), None))
+
+    # Monta os combos do prato com todos os pratos de outras categorias e os guarda como um bloco ordenado
+    # O bloco é juntado aos últimos enquanto eles não forem bem maiores que ele: os blocos ficam com tamanhos
+    # decrescentes (poucos para a leitura juntar) e cada combo é copiado só O(log) vezes até a compactação,
+    # em vez de cada alteração copiar todos os combos novos
+    def _incluir_combos(self, item: Dict[str, Any]) -> None:
+        novos = [montar_combo(item, outro) for outro in self.indice_id.values()
+                 if outro is not item and outro["categoria"] != item["categoria"]]
+        if not novos:
+            return
+        novos.sort(key=chave_combo)
+        self.total_combos_novos += len(novos)
+        blocos = list(self.combos_novos)
+        while blocos and len(blocos[-1]) <= 2 * len(novos):
+            # Duas sequências já ordenadas: a ordenação do Python (timsort) as junta em tempo linear
+            novos = sorted(blocos.pop() + novos, key=chave_combo)
+        blocos.append(novos)
+        # Substitui a lista de blocos de uma vez: leituras em andamento continuam usando a anterior
+        self.combos_novos = blocos
+
+    # Retira um prato dos índices e estatísticas (seus combos ficam obsoletos e são ignorados)
+    def _desindexar(self, item: Dict[str, Any]) -> None:
+        self.indice_busca.remover(item["id"])
+        self.estatisticas.remover(item)
+        self.combos_obsoletos += len(self.indice_id)
+
+    # Inclui o prato nos índices, estatísticas e combos
+    def _indexar(self, item: Dict[str, Any]) -> None:
+        self.indice_id[item["id"]] = item
+        self.indice_busca.adicionar(item)
+        self.estatisticas.adicionar(item)
+        self._incluir_combos(item)
+
+    # Adiciona um prato novo; lança PratoDuplicado se o ID já existir
+    def adicionar(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self.trava:
+            if item["id"] in self.indice_id:
+                raise PratoDuplicado(f"ID {item['id']} já existe.")
+            item = dict(item)
+            self.posicoes[item["id"]] = len(self.itens)
+            self.itens.append(item)
+            self._indexar(item)
+            self._registrar("insercao", item["id"], item)
+            self._talvez_compactar()
+            return item
+
+    # Altera campos de um prato; lança KeyError se ele não existir
+    # O prato alterado é um dicionário novo: combos e respostas que apontam para o antigo ficam obsoletos
+    # Se nenhum campo muda, devolve o prato como está (sem nova versão, histórico nem evento)
+    def atualizar(self, item_id: int, campos: Dict[str, Any]) -> Dict[str, Any]:
+        with self.trava:
+            antigo = self.indice_id.get(item_id)
+            if antigo is None:
+                raise KeyError(item_id)
+            if all(antigo.get(campo) == valor for campo, valor in campos.items() if campo != "id"):
+                return antigo
+            novo = {**antigo, **campos, "id": item_id}
+            self._desindexar(antigo)
+            self.itens[self.posicoes[item_id]] = novo
+            self._indexar(novo)
+            self._registrar("alteracao", item_id, novo)
+            self._talvez_compactar()
+            return novo
+
+    # Remove um prato deixando uma lápide na lista; lança KeyError se ele não existir
+    def remover(self, item_id: int) -> Dict[str, Any]:
+        with self.trava:
+            antigo = self.indice_id.pop(item_id, None)
+            if antigo is None:
+                raise KeyError(item_id)
+            self.itens[self.posicoes.pop(item_id)] = None
+            self.lapides += 1
+            self._desindexar(antigo)
+            self._registrar("remocao", item_id, None)
+            self._talvez_compactar()
+            return antigo
+
+    # Indica se já vale a pena compactar
+    def precisa_compactar(self) -> bool:
+        total_combos = len(self.combos) + self.total_combos_novos
+        limite_combos = max(MINIMO_COMBOS_COMPACTACAO, FRACAO_COMBOS_COMPACTACAO * len(self.combos))
+        return (
+            self.lapides >= max(MINIMO_LAPIDES_COMPACTACAO, FRACAO_LAPIDES_COMPACTACAO * len(self.itens))
+            or min(self.combos_obsoletos, total_combos) >= limite_combos
+            or self.total_combos_novos >= limite_combos
+        )
+
+    # Dispara a compactação em segundo plano (no máximo uma por vez)
+    def _talvez_compactar(self) -> None:
+        if self._compactando or not self.precisa_compactar():
+            return
+        self._compactando = True
+        threading.Thread(target=self.compactar, name="compactacao-cardapio", daemon=True).start()
+
+    # Reconstrói as estruturas sem lápides nem combos obsoletos
+    # A parte cara (gerar os combos) roda fora da trava, sobre uma fotografia dos pratos ativos
+    def compactar(self) -> None:
+        try:
+            with self.trava:
+                fotografia = self.listar()
+                # Reorganiza a lista de pratos sem as lápides (rápido: O(n))
+                self.itens = list(fotografia)
+                self.posicoes = {item["id"]: i for i, item in enumerate(self.itens)}
+                self.lapides = 0
+
+            combos = gerar_todos_combos(fotografia)
+
+            with self.trava:
+                # Combos novos entre pratos da fotografia já estão na lista reconstruída;
+                # os que envolvem pratos incluídos/alterados durante a compactação são mantidos
+                presentes = {id(item) for item in fotografia}
+                blocos = [[c for c in bloco if id(c[0]) not in presentes or id(c[1]) not in presentes]
+                          for bloco in self.combos_novos]
+                self.combos_novos = [bloco for bloco in blocos if bloco]
+                self.total_combos_novos = sum(len(bloco) for bloco in self.combos_novos)
+                self.combos = combos
+                self.combos_obsoletos = 0
+        finally:
+            self._compactando = False
@@ -0,0 +1,185 @@
+# Carga do cardápio em blocos, processados em paralelo para arquivos CSV muito grandes.
+# Este módulo não carrega nada ao ser importado: os processos filhos do pool importam
+# apenas ele (e não o main.py), evitando que cada processo recarregue o cardápio inteiro.
+
+# Pool de processos para distribuir o parsing dos blocos entre os núcleos da máquina
+from concurrent.futures import ProcessPoolExecutor
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any, Tuple, Optional
+# Para manipular caminhos de arquivo de modo portável
+from pathlib import Path
+# Para validar preços (rejeita 'nan' e 'inf', que o float() aceita)
+import math
+# Biblioteca para leitura de arquivos CSV
+import csv
+# Para tratar o texto de um bloco como se fosse um arquivo
+import io
+# Para descobrir quantos núcleos estão disponíveis
+import os
+
+
+# Colunas obrigatórias no cabeçalho do CSV
+COLUNAS_OBRIGATORIAS = ("id", "nome", "preco", "categoria")
+
+# Tamanho aproximado de cada bloco enviado a um processo (16 MB)
+TAMANHO_BLOCO_PADRAO = 16 * 1024 * 1024
+
+# Abaixo deste tamanho o arquivo é lido no próprio processo: criar o pool custaria mais que o parsing
+LIMITE_CARGA_PARALELA = 64 * 1024 * 1024
+
+
+# Lê o cabeçalho do CSV e devolve os nomes das colunas e o byte onde começam os dados
+def ler_cabecalho(caminho: Path) -> Tuple[List[str], int]:
+    with caminho.open("rb") as f:
+        linha = f.readline()
+        inicio_dados = f.tell()
+    # 'utf-8-sig' remove o BOM que o Excel costuma gravar no início do arquivo
+    try:
+        texto = linha.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError(f"CSV {caminho} com cabeçalho que não é UTF-8")
+    cabecalho = next(csv.reader([texto]), [])
+    cabecalho = [coluna.strip() for coluna in cabecalho]
+
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+    if faltando:
+        raise ValueError(f"CSV {caminho} sem as colunas obrigatórias: {', '.join(faltando)}")
+    return cabecalho, inicio_dados
+
+
+# Divide o arquivo em intervalos de bytes [inicio, fim) que sempre terminam em fim de linha
+def dividir_em_blocos(caminho: Path, inicio_dados: int, tamanho_bloco: int) -> List[Tuple[int, int]]:
+    tamanho_arquivo = caminho.stat().st_size
+    blocos: List[Tuple[int, int]] = []
+
+    with caminho.open("rb") as f:
+        inicio = inicio_dados
+        while inicio < tamanho_arquivo:
+            fim = inicio + tamanho_bloco
+            if fim >= tamanho_arquivo:
+                fim = tamanho_arquivo
+            else:
+                # Avança até o fim da linha corrente para nunca cortar um registro ao meio
+                f.seek(fim)
+                f.readline()
+                fim = f.tell()
+            blocos.append((inicio, fim))
+            inicio = fim
+
+    # Observação: campos entre aspas com quebra de linha dentro não são suportados na divisão,
+    # o que é aceitável para o cardápio (id, nome, preço e categoria em uma linha só)
+    return blocos
+
+
+# Indica se algum valor tem bytes que não são UTF-8 (viram caracteres substitutos ao decodificar o bloco)
+def codificacao_invalida(valores: List[str]) -> bool:
+    try:
+        "".join(valores).encode("utf-8")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+# Converte uma linha do CSV para o formato de prato, lançando ValueError com a causa se for inválida
+def converter_linha(row: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        item_id = int(row["id"])
+    except (TypeError, ValueError):
+        raise ValueError(f"id inválido: {row['id']!r}")
+
+    try:
+        preco = float(row["preco"])
+    except (TypeError, ValueError):
+        raise ValueError(f"preço inválido: {row['preco']!r}")
+    if not math.isfinite(preco) or preco < 0:
+        raise ValueError(f"preço inválido: {row['preco']!r}")
+
+    nome = (row["nome"] or "").strip()
+    categoria = (row["categoria"] or "").strip()
+    if not nome:
+        raise ValueError("nome vazio")
+    if not categoria:
+        raise ValueError("categoria vazia")
+
+    return {"id": item_id, "nome": nome, "preco": preco, "categoria": categoria}
+
+
+# Processa um bloco do arquivo (executado dentro de um processo do pool)
+# Retorna os pratos válidos e os erros (ambos com o número da linha relativo ao bloco) e quantas linhas o bloco tem
+def processar_bloco(caminho: str, inicio: int, fim: int, cabecalho: List[str]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]], int]:
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        # Um byte inválido não pode abortar o bloco inteiro: 'surrogateescape' o preserva, e a linha
+        # onde ele está é relatada como erro abaixo
+        texto = f.read(fim - inicio).decode("utf-8", errors="surrogateescape")
+
+    itens: List[Tuple[int, Dict[str, Any]]] = []
+    erros: List[Tuple[int, str]] = []
+    leitor = csv.reader(io.StringIO(texto, newline=""))
+
+    for valores in leitor:
+        # Ignora linhas em branco (por exemplo, quebra de linha extra no fim do arquivo)
+        if not valores or all(not v.strip() for v in valores):
+            continue
+        if codificacao_invalida(valores):
+            erros.append((leitor.line_num, "texto com bytes que não são UTF-8"))
+            continue
+        if len(valores) != len(cabecalho):
+            erros.append((leitor.line_num, f"esperadas {len(cabecalho)} colunas, encontradas {len(valores)}"))
+            continue
+        try:
+            itens.append((leitor.line_num, converter_linha(dict(zip(cabecalho, valores)))))
+        except ValueError as e:
+            erros.append((leitor.line_num, str(e)))
+
+    return itens, erros, leitor.line_num
+
+
+# Carrega o CSV em blocos, em paralelo quando o arquivo é grande
+# Retorna a lista de pratos válidos e a lista de erros ({"linha": n, "erro": mensagem}) sem abortar a carga
+def carregar_em_blocos(
+    caminho: Path,
+    tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+    processos: Optional[int] = None,
+    limite_paralelo: int = LIMITE_CARGA_PARALELA,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    cabecalho, inicio_dados = ler_cabecalho(caminho)
+
+    # Arquivos pequenos viram um único bloco processado aqui mesmo
+    if caminho.stat().st_size < limite_paralelo:
+        tamanho_bloco = max(caminho.stat().st_size, 1)
+    blocos = dividir_em_blocos(caminho, inicio_dados, tamanho_bloco)
+
+    if len(blocos) <= 1:
+        resultados = [processar_bloco(str(caminho), inicio, fim, cabecalho) for inicio, fim in blocos]
+    else:
+        processos = processos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(processos, len(blocos))) as pool:
+            # map preserva a ordem dos blocos, o que mantém a ordem original dos pratos
+            resultados = list(pool.map(
+                processar_bloco,
+                [str(caminho)] * len(blocos),
+                [inicio for inicio, _ in blocos],
+                [fim for _, fim in blocos],
+                [cabecalho] * len(blocos),
+            ))
+
+    # Junta os blocos: converte as linhas relativas em absolutas e descarta IDs repetidos
+    itens: List[Dict[str, Any]] = []
+    erros: List[Dict[str, Any]] = []
+    ids_vistos: set[int] = set()
+    linhas_anteriores = 1  # A linha 1 é o cabeçalho
+
+    for itens_bloco, erros_bloco, linhas_bloco in resultados:
+        for linha, mensagem in erros_bloco:
+            erros.append({"linha": linhas_anteriores + linha, "erro": mensagem})
+        for linha, item in itens_bloco:
+            if item["id"] in ids_vistos:
+                erros.append({"linha": linhas_anteriores + linha, "erro": f"ID {item['id']} repetido; mantida a primeira ocorrência"})
+                continue
+            ids_vistos.add(item["id"])
+            itens.append(item)
+        linhas_anteriores += linhas_bloco
+
+    erros.sort(key=lambda e: e["linha"])
+    return itens, erros
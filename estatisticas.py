@@ -0,0 +1,113 @@
+# Estatísticas de preço por categoria, mantidas incrementalmente.
+# Cada categoria guarda seus preços em uma lista ordenada (SortedList, dividida em blocos pequenos):
+# inserir, remover e acessar por posição custam O(log n), e as consultas de mínimo, máximo, média
+# e percentis não percorrem os pratos.
+
+# Soma exata dos preços (uma soma de floats acumularia erro a cada inclusão e remoção)
+from fractions import Fraction
+# Tipos genéricos para tipagem das funções
+from typing import Dict, Any, Iterable, Sequence
+# Lista sempre ordenada com inserção, remoção e acesso por posição em O(log n)
+from sortedcontainers import SortedList
+
+
+# Percentis devolvidos quando o cliente não pede outros
+PERCENTIS_PADRAO = (25.0, 50.0, 75.0, 90.0, 95.0)
+
+
+# Soma exata de vários preços de uma vez
+# Todo float é uma fração com denominador potência de 2: basta somar os numeradores no maior denominador
+def soma_exata(precos: Iterable[float]) -> Fraction:
+    razoes = [float(p).as_integer_ratio() for p in precos]
+    if not razoes:
+        return Fraction(0)
+    denominador = max(d for _, d in razoes)
+    return Fraction(sum(n * (denominador // d) for n, d in razoes), denominador)
+
+
+# Agregados de preço de um conjunto de pratos (uma categoria ou o cardápio inteiro)
+class EstatisticasPreco:
+    def __init__(self, nome: str, precos: Iterable[float] = ()):
+        self.nome = nome
+        self.precos = SortedList(precos)  # Montada de uma vez (ordenação única) na carga
+        self.soma = soma_exata(self.precos)  # Exata: não depende da ordem das alterações
+
+    # Inclui um preço
+    def adicionar(self, preco: float) -> None:
+        self.precos.add(preco)
+        self.soma += Fraction(preco)
+
+    # Retira um preço (uma ocorrência)
+    def remover(self, preco: float) -> None:
+        if preco in self.precos:
+            self.precos.remove(preco)
+            self.soma -= Fraction(preco)
+
+    # Percentil com interpolação linear entre as posições vizinhas (mesmo critério padrão do numpy)
+    def percentil(self, p: float) -> float:
+        posicao = (len(self.precos) - 1) * p / 100
+        abaixo = int(posicao)
+        acima = min(abaixo + 1, len(self.precos) - 1)
+        fracao = posicao - abaixo
+        return self.precos[abaixo] + (self.precos[acima] - self.precos[abaixo]) * fracao
+
+    # Resumo pronto para resposta: tudo calculado a partir da lista ordenada e da soma
+    def resumo(self, percentis: Sequence[float] = PERCENTIS_PADRAO) -> Dict[str, Any]:
+        quantidade = len(self.precos)
+        if not quantidade:
+            return {"categoria": self.nome, "quantidade": 0, "preco_minimo": None, "preco_maximo": None,
+                    "preco_medio": None, "percentis": {}}
+        return {
+            "categoria": self.nome,
+            "quantidade": quantidade,
+            "preco_minimo": self.precos[0],
+            "preco_maximo": self.precos[-1],
+            "preco_medio": round(float(self.soma / quantidade), 2),
+            "percentis": {f"p{p:g}": round(self.percentil(p), 2) for p in percentis},
+        }
+
+
+# Estatísticas do cardápio inteiro e de cada categoria (categorias comparadas sem diferenciar maiúsculas)
+class EstatisticasCardapio:
+    def __init__(self, itens: Iterable[Dict[str, Any]] = ()):
+        # Agrupa os preços por categoria e monta cada lista ordenada de uma vez
+        precos: Dict[str, list] = {}
+        nomes: Dict[str, str] = {}
+        for item in itens:
+            chave = item["categoria"].lower()
+            precos.setdefault(chave, []).append(item["preco"])
+            nomes.setdefault(chave, item["categoria"])
+        self.geral = EstatisticasPreco("todas", (p for lista in precos.values() for p in lista))
+        self.categorias: Dict[str, EstatisticasPreco] = {c: EstatisticasPreco(nomes[c], lista) for c, lista in precos.items()}
+
+    # Atualiza os agregados com um prato novo
+    def adicionar(self, item: Dict[str, Any]) -> None:
+        chave = item["categoria"].lower()
+        if chave not in self.categorias:
+            self.categorias[chave] = EstatisticasPreco(item["categoria"])
+        self.categorias[chave].adicionar(item["preco"])
+        self.geral.adicionar(item["preco"])
+
+    # Atualiza os agregados retirando um prato
+    def remover(self, item: Dict[str, Any]) -> None:
+        chave = item["categoria"].lower()
+        estatisticas = self.categorias.get(chave)
+        if estatisticas is None:
+            return
+        estatisticas.remover(item["preco"])
+        self.geral.remover(item["preco"])
+        # Categoria sem pratos deixa de aparecer no resumo
+        if not estatisticas.precos:
+            del self.categorias[chave]
+
+    # Resumo de uma categoria (ou None se ela não existir)
+    def resumo_categoria(self, categoria: str, percentis: Sequence[float] = PERCENTIS_PADRAO) -> Dict[str, Any]:
+        estatisticas = self.categorias.get(categoria.lower())
+        return estatisticas.resumo(percentis) if estatisticas else None
+
+    # Resumo geral e de todas as categorias
+    def resumo(self, percentis: Sequence[float] = PERCENTIS_PADRAO) -> Dict[str, Any]:
+        return {
+            "geral": self.geral.resumo(percentis),
+            "categorias": [self.categorias[c].resumo(percentis) for c in sorted(self.categorias)],
+        }
@@ -0,0 +1,118 @@
+# Canal de eventos (Server-Sent Events) com as alterações do cardápio.
+# Um único transmissor recebe cada alteração e a repassa para as filas dos assinantes. Cada fila tem
+# tamanho limitado: quem não consome rápido o bastante é desconectado com um aviso para ressincronizar,
+# em vez de acumular memória no servidor.
+
+# Tipos genéricos para tipagem das funções
+from typing import Dict, Any, Optional, Set, AsyncIterator, List
+# Event loop e filas assíncronas dos assinantes
+import asyncio
+# Para serializar cada evento uma única vez
+import json
+
+
+# Quantos eventos podem ficar pendentes para um assinante antes de ele ser desconectado
+TAMANHO_BUFFER_ASSINANTE = 256
+
+# Intervalo (em segundos) entre comentários de keep-alive em conexões sem eventos
+INTERVALO_KEEPALIVE = 15.0
+
+
+# Formata uma mensagem no protocolo SSE
+def formatar_evento(evento: str, dados: Dict[str, Any], id_evento: Optional[str] = None) -> str:
+    linhas = []
+    if id_evento is not None:
+        linhas.append(f"id: {id_evento}")
+    linhas.append(f"event: {evento}")
+    linhas.append(f"data: {json.dumps(dados, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(linhas) + "\n\n"
+
+
+# Formata uma alteração do cardápio como evento; o id ("instancia:versao") permite retomar com Last-Event-ID
+def formatar_alteracao(alteracao: Dict[str, Any]) -> str:
+    dados = {"versao": alteracao["versao"], "tipo": alteracao["tipo"], "id": alteracao["id"], "prato": alteracao["prato"]}
+    return formatar_evento(alteracao["tipo"], dados, f"{alteracao['instancia']}:{alteracao['versao']}")
+
+
+# Um cliente conectado ao canal de eventos
+class Assinante:
+    def __init__(self, tamanho_buffer: int):
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_buffer)
+        self.descartado = False  # Ficou para trás e será desconectado
+
+
+# Distribui as alterações do cardápio para todos os assinantes conectados
+class TransmissorEventos:
+    def __init__(self, tamanho_buffer: int = TAMANHO_BUFFER_ASSINANTE):
+        self.tamanho_buffer = tamanho_buffer
+        self.assinantes: Set[Assinante] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Registra um novo assinante (chamado dentro do event loop)
+    def assinar(self) -> Assinante:
+        self.loop = asyncio.get_running_loop()
+        assinante = Assinante(self.tamanho_buffer)
+        self.assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante) -> None:
+        self.assinantes.discard(assinante)
+
+    # Publica uma alteração do cardápio ({"instancia", "versao", "tipo", "id", "prato"})
+    # Pode ser chamado de qualquer thread (os endpoints síncronos rodam no pool de threads)
+    def publicar(self, alteracao: Dict[str, Any]) -> None:
+        if self.loop is None or not self.assinantes:
+            return  # Ninguém ouvindo: não há trabalho a fazer
+        mensagem = formatar_alteracao(alteracao)
+        try:
+            self.loop.call_soon_threadsafe(self._distribuir, mensagem)
+        except RuntimeError:
+            pass  # Event loop já encerrado (desligamento do servidor)
+
+    # Coloca a mensagem (já serializada, compartilhada por todos) na fila de cada assinante
+    def _distribuir(self, mensagem: str) -> None:
+        for assinante in list(self.assinantes):
+            try:
+                assinante.fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                self._descartar(assinante, "cliente lento demais")
+
+    # Desconecta todos os assinantes (ex.: o cardápio saiu da memória); pode ser chamado de qualquer thread
+    def encerrar(self) -> None:
+        if self.loop is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._encerrar)
+        except RuntimeError:
+            pass  # Event loop já encerrado
+
+    def _encerrar(self) -> None:
+        for assinante in list(self.assinantes):
+            self._descartar(assinante, "cardápio recarregado")
+
+    # Desconecta um assinante: esvazia a fila e deixa apenas o aviso de ressincronização
+    def _descartar(self, assinante: Assinante, motivo: str) -> None:
+        self.assinantes.discard(assinante)
+        assinante.descartado = True
+        while not assinante.fila.empty():
+            assinante.fila.get_nowait()
+        assinante.fila.put_nowait(formatar_evento("ressincronizar", {"motivo": motivo}))
+
+    # Gera o fluxo SSE de um assinante até ele desconectar (ou ser descartado)
+    async def fluxo(self, assinante: Assinante, iniciais: List[str] = ()) -> AsyncIterator[str]:
+        try:
+            # Mensagens enviadas antes das alterações ao vivo (boas-vindas e eventos perdidos na reconexão)
+            for mensagem in iniciais:
+                yield mensagem
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(assinante.fila.get(), INTERVALO_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão aberta em proxies sem gerar evento no cliente
+                    yield ": keep-alive\n\n"
+                    continue
+                yield mensagem
+                if assinante.descartado and assinante.fila.empty():
+                    break
+        finally:
+            self.cancelar(assinante)
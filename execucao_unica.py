@@ -0,0 +1,56 @@
+# Execução única (single-flight) de cálculos caros.
+# Quando várias requisições idênticas chegam ao mesmo tempo (ex.: o lançamento de uma promoção),
+# só a primeira executa o cálculo; as demais esperam por ela e recebem o mesmo resultado
+# (ou a mesma exceção). Terminado o cálculo, a chave é liberada: nada fica guardado aqui,
+# quem quiser reaproveitar o resultado depois usa o seu próprio cache.
+
+# Tipos genéricos para tipagem das funções
+from typing import Any, Callable, Dict, Hashable, Optional
+# Os endpoints síncronos rodam em threads do pool: a espera é feita com eventos de threading
+import threading
+
+
+# Um cálculo em andamento e o seu resultado
+class _Chamada:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+# Agrupa as chamadas simultâneas com a mesma chave em uma única execução
+class ExecucaoUnica:
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.em_andamento: Dict[Hashable, _Chamada] = {}
+        self.economizadas = 0  # Total de execuções evitadas (para acompanhamento)
+
+    # Executa 'funcao' ou, se já houver uma execução com a mesma chave, espera o resultado dela
+    # A chave deve incluir tudo de que o resultado depende (ex.: a versão dos dados)
+    def executar(self, chave: Hashable, funcao: Callable[[], Any]) -> Any:
+        with self.trava:
+            chamada = self.em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self.em_andamento[chave] = chamada
+            else:
+                self.economizadas += 1
+
+        if not lider:
+            chamada.pronto.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            # Libera a chave antes de acordar quem espera: requisições novas calculam de novo
+            with self.trava:
+                del self.em_andamento[chave]
+            chamada.pronto.set()
+        return chamada.resultado
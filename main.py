@@ -1,17 +1,63 @@
 # Importa as classes do FastAPI para criar a aplicação e gerenciar exceções HTTP, além de permitir definir query params
-from fastapi import FastAPI, HTTPException, Query  
+from fastapi import FastAPI, HTTPException, Query, Request  
+# Rotas reaproveitadas para o cardápio padrão e para cada restaurante, com o cardápio injetado por dependência
+from fastapi import APIRouter, Depends
+# Resposta que envia o corpo aos poucos, a partir de um gerador
+from fastapi.responses import StreamingResponse, Response
+# Converte objetos (modelos, dicionários) em estruturas serializáveis em JSON
+from fastapi.encoders import jsonable_encoder
+# Resposta JSON usada pelo controle de admissão (fora do fluxo normal dos endpoints)
+from fastapi.responses import JSONResponse
 # Importa BaseModel do Pydantic para validar e documentar dados de entrada e saída
-from pydantic import BaseModel  
+from pydantic import BaseModel, Field  
 # Biblioteca para manipulação de dados tabulares (DataFrames)
 import pandas as pd  
 # Uvicorn é o servidor para rodar a aplicação FastAPI
 import uvicorn  
 # Importa tipos genéricos para tipagem das funções e variáveis do código
-from typing import List, Dict, Any, Tuple  
+from typing import List, Dict, Any, Tuple, Iterator, Literal, Callable, Hashable, Optional, Deque  
 # Para manipular caminhos de arquivo de modo portável, independente do sistema operacional
 from pathlib import Path  
 # Biblioteca para leitura e escrita de arquivos CSV
 import csv  
+# Para ler as configurações por variáveis de ambiente
+import os
+# Para montar em memória cada lote de linhas exportadas
+import io
+# Para serializar cada prato em uma linha NDJSON
+import json
+# Compressão gzip das respostas grandes
+import gzip
+# Nome do cardápio na pasta de cache (hash do caminho do CSV)
+import hashlib
+# Controle de concorrência assíncrono do limitador de requisições caras
+import asyncio
+# Filas de espera do limitador de requisições caras
+from collections import deque
+# Para ler a query string no controle de admissão
+from urllib.parse import parse_qs
+# Carga do CSV em blocos paralelos, com validação e relatório de linhas inválidas
+from carga_cardapio import carregar_em_blocos
+# Cardápio em memória com índices, combos e estatísticas atualizados a cada alteração
+from cardapio import Cardapio, PratoDuplicado
+# Canal de eventos (SSE) com as alterações do cardápio
+from eventos import TransmissorEventos, formatar_evento, formatar_alteracao
+# Cardápios de vários restaurantes, carregados sob demanda e descartados por LRU
+from restaurantes import GerenciadorCardapios, restaurante_valido, MEMORIA_MAXIMA_PADRAO_MB
+# Percentis padrão das estatísticas de preço
+from estatisticas import PERCENTIS_PADRAO
+# Cache em disco das estruturas derivadas do CSV (evita recalcular tudo a cada início)
+from cache_derivados import carregar_ou_gerar, hash_arquivo, hash_codigo
+# Uma única execução para requisições idênticas simultâneas
+from execucao_unica import ExecucaoUnica
+# Recomendação de pratos semelhantes (vizinhos pré-calculados e gravados em disco)
+from recomendacao import ModeloSemelhantes, carregar_ou_construir, VIZINHOS_POR_PRATO
+
+# Brotli é opcional: se o pacote 'brotli' não estiver instalado, as respostas usam apenas gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 
 # Cria a instância da aplicação FastAPI
@@ -22,88 +68,596 @@ app = FastAPI(title="Minha API de Cardápio", version="1.0")
 class Prato(BaseModel):
     id: int          # Identificador único do prato
     nome: str        # Nome do prato
-    preco: float     # Preço do prato
+    preco: float = Field(ge=0)  # Preço do prato (não negativo, mesma regra da carga do CSV)
     categoria: str   # Categoria do prato, exemplo: 'Pizza', 'Lanches', 'Saladas'
 
 
+# Define o modelo de alteração parcial (PATCH): só os campos enviados são alterados
+class PratoParcial(BaseModel):
+    nome: Optional[str] = None        # Novo nome do prato
+    preco: Optional[float] = Field(None, ge=0)  # Novo preço do prato (não negativo)
+    categoria: Optional[str] = None   # Nova categoria do prato
+
+
+# Máximo de IDs aceitos em uma consulta em lote
+MAX_IDS_LOTE = 500
+
+
+# Define o corpo da consulta de vários pratos por ID em uma única requisição
+class ConsultaLote(BaseModel):
+    ids: List[int]   # IDs dos pratos procurados
+
+
+# Pasta com um CSV por restaurante (dados/restaurantes/<restaurante>.csv)
+PASTA_RESTAURANTES = Path(os.environ.get("CARDAPIO_PASTA_RESTAURANTES", Path(__file__).parent / "dados" / "restaurantes"))
+
+# Orçamento de memória (em MB) para os cardápios dos restaurantes carregados ao mesmo tempo
+MEMORIA_MAXIMA_MB = float(os.environ.get("CARDAPIO_MEMORIA_MAX_MB", MEMORIA_MAXIMA_PADRAO_MB))
+
+# Pasta onde ficam as estruturas calculadas a partir dos dados (cardápios com índices e combos, modelo de pratos semelhantes)
+PASTA_CACHE = Path(os.environ.get("CARDAPIO_PASTA_CACHE", Path(__file__).parent / "cache"))
+
+
+# CSV do cardápio padrão: 'dataset_cardapio.csv' dentro da pasta 'dados' no mesmo diretório do script
+# (ou o arquivo indicado na variável de ambiente CARDAPIO_CSV, usada por exemplo no teste de carga)
+CSV_CARDAPIO = Path(os.environ.get("CARDAPIO_CSV", Path(__file__).parent / "dados" / "dataset_cardapio.csv"))
+
+# Versão do código que lê o CSV e monta as estruturas derivadas: se algum desses arquivos muda, o cache é refeito
+VERSAO_ESTRUTURAS = hash_codigo("carga_cardapio", "cardapio", "busca_aproximada", "estatisticas")
+
+
 # Função que carrega os dados do cardápio a partir de um arquivo CSV
-def carregar_cardapio() -> List[Dict[str, Any]]:
-    # Cria o caminho para o arquivo CSV 'dataset_cardapio.csv' dentro da pasta 'dados' no mesmo diretório do script
-    caminho = Path(__file__).parent / "dados" / "dataset_cardapio.csv"
+# Retorna os pratos e as linhas inválidas ({"linha", "erro"})
+def carregar_cardapio(caminho: Path = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Por padrão usa o CSV do cardápio padrão
+    if caminho is None:
+        caminho = CSV_CARDAPIO
     
     # Verifica se o arquivo existe, caso contrário lança uma exceção de arquivo não encontrado
     if not caminho.exists():
         raise FileNotFoundError(f"CSV não encontrado em {caminho}")
     
-    # Inicializa uma lista vazia onde serão armazenados os pratos lidos do CSV
-    itens: List[Dict[str, Any]] = []
-    
-    # Abre o arquivo para leitura, utilizando encoding adequado para evitar problemas com caracteres
-    with caminho.open("r", encoding="utf-8-sig", newline="") as f:
-        # Usa DictReader para ler cada linha como um dicionário
-        r = csv.DictReader(f)
-        # Itera sobre cada linha no CSV e converte os dados para tipos apropriados, adicionando-os na lista
-        for row in r:
-            itens.append({
-                "id": int(row["id"]),              # Converte para inteiro
-                "nome": row["nome"],              # Mantém como string
-                "preco": float(row["preco"]),    # Converte para float
-                "categoria": row["categoria"]    # Mantém como string
-            })
-    # Retorna a lista de pratos carregados do CSV
-    return itens
+    # Lê o CSV em blocos (em paralelo para arquivos grandes), validando os tipos de cada linha
+    return carregar_em_blocos(caminho)
+
+
+# Linhas inválidas não abortam a carga: são informadas com o número da linha no arquivo
+def relatar_erros(caminho: Path, erros: List[Dict[str, Any]]) -> None:
+    if erros:
+        print(f"{len(erros)} linha(s) inválida(s) ignorada(s) em {caminho}")
+        for erro in erros[:20]:
+            print(f"  linha {erro['linha']}: {erro['erro']}")
+
+
+# Nome do cardápio na pasta de cache: nome do arquivo + hash do caminho completo
+# (processos com CSVs diferentes podem dividir a mesma pasta de cache sem apagar os arquivos um do outro)
+def nome_no_cache(caminho: Path) -> str:
+    return f"{caminho.stem}-{hashlib.sha256(str(caminho.resolve()).encode('utf-8')).hexdigest()[:12]}"
+
+
+# Monta o cardápio em memória: índice por ID, índice de busca aproximada, combos e estatísticas
+# As estruturas são lidas do cache em disco quando o CSV e o código são os mesmos da última carga;
+# caso contrário são calculadas e gravadas para a próxima
+def montar_cardapio(caminho: Path) -> Cardapio:
+    if not caminho.exists():
+        raise FileNotFoundError(f"CSV não encontrado em {caminho}")
+
+    def gerar() -> Dict[str, Any]:
+        itens, erros = carregar_cardapio(caminho)
+        # As linhas inválidas vão junto para o cache: o relatório aparece em toda carga, não só na primeira
+        return {**Cardapio(itens).derivados(), "erros": erros}
+
+    nome = nome_no_cache(caminho)
+    arquivo = PASTA_CACHE / f"{nome}.{hash_arquivo(caminho)[:16]}.{VERSAO_ESTRUTURAS[:16]}.pickle"
+    derivados = carregar_ou_gerar(arquivo, gerar, antigos=f"{nome}.*.pickle")
+    relatar_erros(caminho, derivados["erros"])
+    cardapio = Cardapio(derivados=derivados)
+    cardapio.nome = nome
+    return cardapio
 
 
 # Tenta carregar o cardápio ao iniciar a aplicação
+# (a versão do cardápio muda a cada alteração e invalida as respostas em cache)
 try:
-    dados_cardapio = carregar_cardapio()
+    CARDAPIO = montar_cardapio(CSV_CARDAPIO)
 except FileNotFoundError as e:
     # Caso o arquivo CSV não seja encontrado, imprime o erro e inicializa o cardápio vazio
     print(e)
-    dados_cardapio = []
+    CARDAPIO = Cardapio([])
+
+# Transmissores dos eventos de alteração (um por cardápio carregado), para os clientes de /dados/eventos
+TRANSMISSORES: Dict[str, TransmissorEventos] = {}
+
+
+# Liga o cardápio ao seu transmissor de eventos
+def preparar_cardapio(cardapio: Cardapio) -> Cardapio:
+    transmissor = TransmissorEventos()
+    TRANSMISSORES[cardapio.instancia] = transmissor
+    cardapio.ouvintes.append(transmissor.publicar)
+    return cardapio
+
+
+preparar_cardapio(CARDAPIO)
+
+
+# Monta o cardápio de um restaurante a partir do seu CSV
+def carregar_restaurante(restaurante: str) -> Cardapio:
+    return preparar_cardapio(montar_cardapio(PASTA_RESTAURANTES / f"{restaurante}.csv"))
+
+
+# Restaurante descartado da memória: desconecta seus assinantes de eventos pedindo ressincronização
+def descartar_restaurante(restaurante: str, cardapio: Cardapio) -> None:
+    transmissor = TRANSMISSORES.pop(cardapio.instancia, None)
+    if transmissor is not None:
+        transmissor.encerrar()
+    MODELOS_SEMELHANTES.pop(cardapio.instancia, None)
+
+
+# Memória do modelo de semelhantes do cardápio (se já foi montado), contada no orçamento do restaurante
+def memoria_modelo(cardapio: Cardapio) -> int:
+    modelo = MODELOS_SEMELHANTES.get(cardapio.instancia)
+    return modelo.memoria_estimada() if modelo is not None else 0
+
+
+# Cardápios dos restaurantes, carregados no primeiro acesso e descartados por LRU conforme o orçamento de memória
+RESTAURANTES = GerenciadorCardapios(carregar_restaurante, MEMORIA_MAXIMA_MB, ao_descartar=descartar_restaurante,
+                                    memoria_adicional=memoria_modelo)
+
+
+# Modelos de pratos semelhantes (um por cardápio), montados no primeiro pedido de recomendação
+MODELOS_SEMELHANTES: Dict[str, ModeloSemelhantes] = {}
+
+
+# Devolve o modelo de semelhantes do cardápio, carregando do disco ou calculando na primeira vez
+# Com a trava do cardápio, nenhuma alteração escapa entre a fotografia dos pratos e o registro do ouvinte
+def modelo_semelhantes(cardapio: Cardapio) -> ModeloSemelhantes:
+    modelo = MODELOS_SEMELHANTES.get(cardapio.instancia)
+    if modelo is not None:
+        return modelo
+    with cardapio.trava:
+        modelo = MODELOS_SEMELHANTES.get(cardapio.instancia)
+        if modelo is None:
+            modelo = carregar_ou_construir(cardapio.listar(), PASTA_CACHE, cardapio.nome or "cardapio")
+
+            # Pratos incluídos, alterados ou removidos depois atualizam o modelo de forma incremental
+            # Se uma atualização falhar, o modelo fica inconsistente: é descartado e refeito no próximo pedido
+            def atualizar_modelo(alteracao: Dict[str, Any]) -> None:
+                try:
+                    modelo.aplicar(alteracao)
+                except Exception:
+                    cardapio.ouvintes.remove(atualizar_modelo)
+                    MODELOS_SEMELHANTES.pop(cardapio.instancia, None)
+                    raise
+
+            cardapio.ouvintes.append(atualizar_modelo)
+            MODELOS_SEMELHANTES[cardapio.instancia] = modelo
+            RESTAURANTES.registrar_crescimento(cardapio)  # O modelo conta no orçamento do restaurante
+        return modelo
+
+
+# Dependência que escolhe o cardápio da requisição: o do restaurante da URL ou o cardápio padrão
+def cardapio_da_requisicao(request: Request) -> Cardapio:
+    restaurante = request.path_params.get("restaurante")
+    if restaurante is None:
+        return CARDAPIO
+    if not restaurante_valido(restaurante):
+        raise HTTPException(status_code=400, detail=f"Identificador de restaurante inválido: {restaurante}")
+    try:
+        return RESTAURANTES.obter(restaurante)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Restaurante {restaurante} não encontrado")
+
+
+# Respostas menores que este tamanho (em bytes) são enviadas sem compressão
+LIMITE_COMPRESSAO = 1024
+
+
+# Escolhe a melhor codificação aceita pelo cliente a partir do cabeçalho Accept-Encoding
+def escolher_codificacao(accept_encoding: str) -> str:
+    aceitas: Dict[str, float] = {}
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        peso = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                peso = float(parametros.strip()[2:])
+            except ValueError:
+                peso = 0.0
+        if nome:
+            aceitas[nome.lower()] = peso
+    # Brotli comprime melhor JSON repetitivo; gzip é o reserva universal
+    for codificacao in ("br", "gzip"):
+        if codificacao == "br" and brotli is None:
+            continue
+        if aceitas.get(codificacao, aceitas.get("*", 0.0)) > 0:
+            return codificacao
+    return "identity"
+
+
+# Comprime o corpo na codificação escolhida
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=5)
+    if codificacao == "gzip":
+        return gzip.compress(corpo, compresslevel=6)
+    return corpo
+
+
+# Requisições idênticas simultâneas sobre a mesma versão dos dados compartilham um único cálculo
+# (ex.: centenas de pedidos de combos ao mesmo tempo depois de uma alteração no cardápio)
+EXECUCOES = ExecucaoUnica()
+
+
+# Serializa o conteúdo de uma resposta em JSON compacto
+def serializar(conteudo: Any) -> bytes:
+    return json.dumps(jsonable_encoder(conteudo), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# Monta uma resposta JSON comprimida conforme o cliente, reaproveitando o corpo enquanto os dados não mudarem
+# Os corpos ficam no cache do próprio cardápio: chave -> (versão dos dados, {codificação: bytes})
+def resposta_comprimida(request: Request, cardapio: Cardapio, chave: Hashable, gerar_conteudo: Callable[[], Any]) -> Response:
+    entrada = cardapio.cache.get(chave)
+    if entrada is None or entrada[0] != cardapio.versao:
+        # Lê a versão antes de gerar: se os dados mudarem no meio, a próxima requisição regenera o corpo
+        versao = cardapio.versao
+
+        def gerar() -> Tuple[int, Dict[str, bytes]]:
+            nova = (versao, {"identity": serializar(gerar_conteudo())})
+            cardapio.cache[chave] = nova
+            RESTAURANTES.registrar_crescimento(cardapio)  # O corpo guardado conta no orçamento de memória
+            return nova
+
+        entrada = EXECUCOES.executar((cardapio.instancia, chave, versao), gerar)
+
+    corpos = entrada[1]
+    codificacao = "identity"
+    if len(corpos["identity"]) >= LIMITE_COMPRESSAO:
+        codificacao = escolher_codificacao(request.headers.get("accept-encoding", ""))
+    # Comprime só na primeira vez em cada codificação; as próximas requisições reutilizam o resultado
+    if codificacao not in corpos:
+        corpos[codificacao] = EXECUCOES.executar(
+            (cardapio.instancia, chave, entrada[0], codificacao),
+            lambda: corpos.get(codificacao) or comprimir(corpos["identity"], codificacao),
+        )
+        RESTAURANTES.registrar_crescimento(cardapio)
+
+    # Informa a versão dos dados do corpo, ponto de partida para a sincronização incremental (/dados/alteracoes)
+    cabecalhos = {"Vary": "Accept-Encoding", "X-Versao-Dados": str(entrada[0]), "X-Instancia-Dados": cardapio.instancia}
+    if codificacao != "identity":
+        cabecalhos["Content-Encoding"] = codificacao
+    return Response(content=corpos[codificacao], media_type="application/json", headers=cabecalhos)
+
+
+# Regra de admissão de uma rota cara: quantas execuções simultâneas, quantas na fila e quanto custa cada uma
+class RegraAdmissao:
+    def __init__(self, nome: str, custo: int, concorrencia: int, fila: int, espera_maxima: float = 5.0, retry_after: int = 1):
+        self.nome = nome                    # Nome da regra (aparece na resposta 503)
+        self.custo = custo                  # Unidades da capacidade total consumidas por execução (0: fora dela)
+        self.concorrencia = concorrencia    # Máximo de execuções simultâneas desta rota
+        self.fila = fila                    # Máximo de requisições aguardando vaga
+        self.espera_maxima = espera_maxima  # Segundos que uma requisição pode aguardar na fila
+        self.retry_after = retry_after      # Valor do cabeçalho Retry-After nas respostas 503
+
+
+# Rotas caras e seus limites; as demais (ex.: /dados/id/{id}) não passam pelo limitador e nunca esperam
+# A exportação segura a vaga até o último byte (minutos para arquivos grandes, conforme o cliente): por isso
+# tem orçamento próprio, só com o limite de concorrência, e downloads lentos não bloqueiam as outras rotas caras
+REGRAS_ADMISSAO: Dict[str, RegraAdmissao] = {
+    "combos": RegraAdmissao("combos", custo=4, concorrencia=2, fila=8),
+    "exportar": RegraAdmissao("exportar", custo=0, concorrencia=2, fila=4),
+    "dados_completo": RegraAdmissao("dados_completo", custo=2, concorrencia=4, fila=16),
+    "busca_sem_filtro": RegraAdmissao("busca_sem_filtro", custo=2, concorrencia=4, fila=16),
+}
+
+# Capacidade total (em unidades de custo) compartilhada pelas rotas caras
+CAPACIDADE_ROTAS_CARAS = 8
+
+
+# Identifica se a requisição é cara e qual regra se aplica a ela
+def classificar_requisicao(metodo: str, caminho: str, query_string: bytes) -> Optional[RegraAdmissao]:
+    if metodo != "GET":
+        return None
+    caminho = caminho.rstrip("/") or "/"
+    # As rotas de um restaurante (/restaurantes/<restaurante>/...) seguem as mesmas regras das rotas padrão
+    if caminho.startswith("/restaurantes/"):
+        caminho = "/" + "/".join(caminho.split("/")[3:])
+    if caminho == "/cardapio/combos-diversidade":
+        return REGRAS_ADMISSAO["combos"]
+    if caminho == "/dados/exportar":
+        return REGRAS_ADMISSAO["exportar"]
+    if caminho == "/dados":
+        return REGRAS_ADMISSAO["dados_completo"]
+    if caminho == "/dados/buscar":
+        parametros = parse_qs(query_string.decode("latin-1"))
+        if not parametros.get("nome") and not parametros.get("categoria"):
+            return REGRAS_ADMISSAO["busca_sem_filtro"]
+    return None
+
+
+# Controla quantas requisições caras executam ao mesmo tempo, com filas limitadas por rota
+# Roda inteiramente no event loop, então não precisa de travas
+class ControleAdmissao:
+    def __init__(self, capacidade: int):
+        self.capacidade = capacidade
+        self.em_uso = 0
+        self.ativos: Dict[str, int] = {}
+        self.filas: Dict[str, Deque[Tuple[RegraAdmissao, asyncio.Future]]] = {}
+
+    # Verifica se a regra cabe agora nos limites da rota e na capacidade total
+    def _cabe(self, regra: RegraAdmissao) -> bool:
+        return (self.ativos.get(regra.nome, 0) < regra.concorrencia
+                and self.em_uso + regra.custo <= self.capacidade)
+
+    def _ocupar(self, regra: RegraAdmissao) -> None:
+        self.ativos[regra.nome] = self.ativos.get(regra.nome, 0) + 1
+        self.em_uso += regra.custo
+
+    # Tenta obter uma vaga; retorna False se a fila estiver cheia ou a espera passar do limite
+    async def entrar(self, regra: RegraAdmissao) -> bool:
+        fila = self.filas.setdefault(regra.nome, deque())
+        # Entra direto se houver vaga e ninguém da mesma rota estiver esperando na frente
+        if not fila and self._cabe(regra):
+            self._ocupar(regra)
+            return True
+        # Rejeita rápido quando a fila já está cheia (load shedding)
+        if len(fila) >= regra.fila:
+            return False
+
+        futuro = asyncio.get_running_loop().create_future()
+        fila.append((regra, futuro))
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), regra.espera_maxima)
+            return True
+        except asyncio.TimeoutError:
+            # A vaga pode ter sido concedida no mesmo instante do timeout
+            if futuro.done() and not futuro.cancelled():
+                return True
+            futuro.cancel()
+            self._remover_da_fila(fila, futuro)
+            return False
+        except asyncio.CancelledError:
+            # Cliente desistiu: devolve a vaga se ela já tinha sido concedida
+            if futuro.done() and not futuro.cancelled():
+                self.sair(regra)
+            else:
+                futuro.cancel()
+                self._remover_da_fila(fila, futuro)
+            raise
+
+    def _remover_da_fila(self, fila: Deque[Tuple[RegraAdmissao, asyncio.Future]], futuro: asyncio.Future) -> None:
+        for entrada in fila:
+            if entrada[1] is futuro:
+                fila.remove(entrada)
+                break
+
+    # Libera a vaga e acorda quem estiver esperando
+    def sair(self, regra: RegraAdmissao) -> None:
+        self.ativos[regra.nome] -= 1
+        self.em_uso -= regra.custo
+        self._acordar()
+
+    # Concede vagas aos que esperam, priorizando as rotas de menor custo
+    def _acordar(self) -> None:
+        for nome in sorted(self.filas, key=lambda n: REGRAS_ADMISSAO[n].custo):
+            fila = self.filas[nome]
+            while fila and self._cabe(fila[0][0]):
+                regra, futuro = fila.popleft()
+                if futuro.done():
+                    continue  # Já desistiu (timeout ou cancelamento)
+                self._ocupar(regra)
+                futuro.set_result(True)
+
+
+# Middleware ASGI que aplica o controle de admissão antes de a requisição ocupar uma thread do pool
+# A vaga só é liberada depois de todo o corpo ser enviado (inclusive respostas em streaming)
+class MiddlewareAdmissao:
+    def __init__(self, app, capacidade: int = CAPACIDADE_ROTAS_CARAS):
+        self.app = app
+        self.controle = ControleAdmissao(capacidade)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        regra = classificar_requisicao(scope["method"], scope["path"], scope.get("query_string", b""))
+        # Requisições baratas seguem direto, sem fila
+        if regra is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controle.entrar(regra):
+            resposta = JSONResponse(
+                status_code=503,
+                content={"detail": f"Servidor ocupado ({regra.nome}). Tente novamente em instantes."},
+                headers={"Retry-After": str(regra.retry_after)},
+            )
+            await resposta(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controle.sair(regra)
+
+
+# Registra o controle de admissão na aplicação
+app.add_middleware(MiddlewareAdmissao)
+
+
+# Rotas do cardápio: valem para o cardápio padrão e, com o prefixo /restaurantes/{restaurante}, para cada restaurante
+rotas = APIRouter()
 
 
 # Endpoint raiz que retorna informações gerais sobre a API
-@app.get("/", tags=["Informações"])
-def home():
+@rotas.get("/", tags=["Informações"])
+def home(cardapio: Cardapio = Depends(cardapio_da_requisicao)):
     # Retorna um dicionário com informações sobre o projeto, autor, descrição e total de pratos carregados
     return {
         "projeto": "Minha Primeira API",
         "autor": "Raquel Santos Faria",
         "descricao": "API para servir dados do cardápio",
-        "total_registros": len(dados_cardapio)
+        "total_registros": len(cardapio)
     }
 
 
 # Endpoint que retorna toda a lista de pratos
-@app.get("/dados", response_model=List[Prato], tags=["Dados"])
-def listar_todos():
-    # Retorna a lista completa de pratos, garantindo que ela esteja conforme o modelo Prato
-    return dados_cardapio
+@rotas.get("/dados", response_model=List[Prato], tags=["Dados"])
+def listar_todos(request: Request, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Retorna a lista completa de pratos, já serializada e comprimida conforme o cliente
+    return resposta_comprimida(request, cardapio, "dados", cardapio.listar)
 
 
 # Endpoint para buscar um prato pelo ID
-@app.get("/dados/id/{item_id}", response_model=Prato, tags=["Dados"])
-def buscar_por_id(item_id: int):
-    # Itera sobre os pratos para encontrar o que corresponde ao ID fornecido
-    for item in dados_cardapio:
-        if item["id"] == item_id:
-            return item  # Retorna o prato encontrado
+@rotas.get("/dados/id/{item_id}", response_model=Prato, tags=["Dados"])
+def buscar_por_id(item_id: int, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Consulta o índice por ID para encontrar o prato correspondente
+    item = cardapio.obter(item_id)
+    if item is not None:
+        return item  # Retorna o prato encontrado
     # Caso não encontre, lança exceção HTTP 404 com mensagem apropriada
     raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado")
 
 
+# Endpoint com os pratos mais parecidos com um prato (nome, categoria e preço)
+# Os vizinhos já estão calculados: a resposta é só uma consulta
+@rotas.get("/dados/id/{item_id}/semelhantes", tags=["Dados"])
+def pratos_semelhantes(
+    item_id: int,
+    qtd: int = Query(5, ge=1, le=VIZINHOS_POR_PRATO, description="Quantidade de pratos semelhantes"),
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    item = cardapio.obter(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado")
+    semelhantes: List[Dict[str, Any]] = []
+    for outro_id, nota in modelo_semelhantes(cardapio).semelhantes(item_id, qtd) or []:
+        outro = cardapio.obter(outro_id)
+        if outro is not None:  # Removido entre a consulta ao modelo e a montagem da resposta
+            semelhantes.append({**outro, "score": nota})
+    return {"prato": item, "semelhantes": semelhantes}
+
+
+# Endpoint de sincronização incremental: devolve só as alterações feitas depois de uma versão
+# Inserções e alterações trazem o prato completo; remoções trazem apenas o ID
+@rotas.get("/dados/alteracoes", tags=["Dados"])
+def listar_alteracoes(
+    desde: int = Query(..., ge=0, description="Última versão que o cliente já tem (cabeçalho X-Versao-Dados de /dados)"),
+    instancia: str = Query(None, description="Instância informada junto com a versão (cabeçalho X-Instancia-Dados)"),
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    # Versões de outra instância (servidor reiniciado) ou antigas demais exigem baixar o cardápio inteiro
+    alteracoes = None
+    if instancia is None or instancia == cardapio.instancia:
+        alteracoes = cardapio.alteracoes_desde(desde)
+    if alteracoes is None:
+        return {"instancia": cardapio.instancia, "versao_atual": cardapio.versao, "ressincronizar": True, "alteracoes": []}
+    
+    return {
+        "instancia": cardapio.instancia,
+        "versao_atual": alteracoes[-1][0] if alteracoes else desde,
+        "ressincronizar": False,
+        "alteracoes": [
+            {"versao": versao, "tipo": tipo, "id": item_id, "prato": item}
+            for versao, tipo, item_id, item in alteracoes
+        ],
+    }
+
+
+# Endpoint de eventos (Server-Sent Events): envia cada inclusão, alteração ou remoção assim que acontece
+# Substitui o polling de /dados; um cliente que reconecta com Last-Event-ID recebe o que perdeu
+@rotas.get("/dados/eventos", tags=["Dados"])
+async def eventos_cardapio(request: Request, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Assina antes de ler o histórico para não perder alterações no meio (repetidas são inofensivas)
+    transmissor = TRANSMISSORES[cardapio.instancia]
+    assinante = transmissor.assinar()
+    iniciais = [formatar_evento("inicio", {"instancia": cardapio.instancia, "versao": cardapio.versao})]
+    
+    # Reconexão: reenvia as alterações desde o último evento recebido, se ainda estiverem no histórico
+    ultimo = request.headers.get("last-event-id")
+    if ultimo:
+        instancia, _, versao = ultimo.partition(":")
+        perdidas = None
+        if instancia == cardapio.instancia and versao.isdigit():
+            perdidas = cardapio.alteracoes_desde(int(versao))
+        if perdidas is None:
+            iniciais.append(formatar_evento("ressincronizar", {"motivo": "histórico indisponível"}))
+        else:
+            for versao_alteracao, tipo, item_id, item in perdidas:
+                iniciais.append(formatar_alteracao({"instancia": cardapio.instancia, "versao": versao_alteracao,
+                                                    "tipo": tipo, "id": item_id, "prato": item}))
+    
+    cabecalhos = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(transmissor.fluxo(assinante, iniciais), media_type="text/event-stream", headers=cabecalhos)
+
+
+# Endpoint para buscar vários pratos por ID de uma só vez (ex.: resolver a cesta de um pedido)
+@rotas.post("/dados/lote", tags=["Dados"])
+def buscar_em_lote(consulta: ConsultaLote, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Limita o tamanho do lote para manter a resposta pequena
+    if len(consulta.ids) > MAX_IDS_LOTE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_IDS_LOTE} IDs por consulta.")
+    
+    encontrados: List[Dict[str, Any]] = []
+    ausentes: List[int] = []
+    vistos: set[int] = set()
+    # Cada ID é uma consulta direta ao índice: o custo depende só do tamanho do lote
+    for item_id in consulta.ids:
+        if item_id in vistos:
+            continue  # Ignora IDs repetidos no pedido
+        vistos.add(item_id)
+        item = cardapio.obter(item_id)
+        if item is None:
+            ausentes.append(item_id)
+        else:
+            encontrados.append(item)
+    
+    # Retorna os pratos encontrados (na ordem pedida) e os IDs que não existem
+    return {"encontrados": encontrados, "ausentes": ausentes}
+
+
 # Endpoint que retorna pratos filtrados por categoria, ignorando letras maiúsculas/minúsculas
-@app.get("/dados/categoria/{categoria}", response_model=List[Prato], tags=["Dados"])
-def buscar_por_categoria(categoria: str):
+@rotas.get("/dados/categoria/{categoria}", response_model=List[Prato], tags=["Dados"])
+def buscar_por_categoria(categoria: str, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
     # Retorna lista somente com pratos cuja categoria bate com a requisitada, caso-insensitive
-    return [item for item in dados_cardapio if item["categoria"].lower() == categoria.lower()]
+    return [item for item in cardapio.ativos() if item["categoria"].lower() == categoria.lower()]
 
 
 # Endpoint com múltiplos filtros opcionais por query parameters
-@app.get("/dados/buscar", tags=["Dados"])
-def buscar_com_filtros(nome: str = None, categoria: str = None, limite: int = 5):
-    resultados = dados_cardapio
+# No modo 'aproximado' o nome é comparado sem acentos e com tolerância a erros de digitação, e os resultados vêm ordenados pela nota
+@rotas.get("/dados/buscar", tags=["Dados"])
+def buscar_com_filtros(
+    nome: str = None,
+    categoria: str = None,
+    limite: int = 5,
+    modo: Literal["exato", "aproximado"] = "exato",
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    # Requisições iguais ao mesmo tempo (mesmos filtros e mesma versão dos dados) fazem uma única busca
+    # e recebem o mesmo corpo já serializado
+    versao = cardapio.versao
+    corpo = EXECUCOES.executar(
+        (cardapio.instancia, "buscar", nome, categoria, limite, modo, versao),
+        lambda: serializar(executar_busca(cardapio, nome, categoria, limite, modo)),
+    )
+    return Response(content=corpo, media_type="application/json", headers={"X-Versao-Dados": str(versao)})
+
+
+# Aplica os filtros da busca e monta o resultado
+def executar_busca(cardapio: Cardapio, nome: Optional[str], categoria: Optional[str], limite: int, modo: str) -> Dict[str, Any]:
+    filtros = {"nome": nome, "categoria": categoria, "limite": limite, "modo": modo}  # Indica filtros aplicados
+    
+    # Busca aproximada: usa o índice de trigramas e devolve a nota de cada prato
+    if modo == "aproximado" and nome:
+        # 'truncado' indica que o orçamento da busca acabou antes de verificar todos os candidatos
+        # (os trechos exatos estão sempre completos; 'total' conta só o que foi verificado)
+        encontrados, truncado = cardapio.indice_busca.buscar(nome, categoria=categoria)
+        return {
+            "filtros": filtros,
+            "resultados": [{**item, "score": round(nota, 3)} for nota, item in encontrados[:limite]],
+            "total": len(encontrados),
+            "truncado": truncado,
+        }
+    
+    resultados = cardapio.listar()
     # Filtra por nome parcial (se informado)
     if nome:
         resultados = [item for item in resultados if nome.lower() in item["nome"].lower()]
@@ -112,52 +666,77 @@ def buscar_com_filtros(nome: str = None, categoria: str = None, limite: int = 5)
         resultados = [item for item in resultados if item["categoria"].lower() == categoria.lower()]
     # Retorna os resultados limitados conforme o parâmetro limite
     return {
-        "filtros": {"nome": nome, "categoria": categoria, "limite": limite},  # Indica filtros aplicados
+        "filtros": filtros,
         "resultados": resultados[:limite],  # Resultados limitados
         "total": len(resultados),            # Total resultados encontrados
     }
 
 
-# Função para gerar todos os combos possíveis com pratos de categorias diferentes
-def gerar_todos_combos(cardapio: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any], float]]:
-    # Ordena os pratos por preço e id para garantir ordenação determinística
-    itens = sorted(cardapio, key=lambda x: (x["preco"], x["id"]))
-    combos: List[Tuple[Dict[str, Any], Dict[str, Any], float]] = []
-    n = len(itens)
-    
-    # Percorre todos os pares possíveis de pratos (sem repetição)
-    for a in range(n):
-        for b in range(a + 1, n):
-            # Garante que os pratos tenham categorias diferentes para diversidade
-            if itens[a]["categoria"] != itens[b]["categoria"]:
-                # Calcula preço total do combo
-                total = itens[a]["preco"] + itens[b]["preco"]
-                # Adiciona o par e o total na lista de combos
-                combos.append((itens[a], itens[b], total))
-    
-    # Ordena os combos pelo preço total crescente, depois pelo ID dos pratos para estabilidade
-    combos.sort(key=lambda t: (t[2], t[0]["id"], t[1]["id"]))
-    
-    # Retorna a lista completa de combos
-    return combos
+# Quantidade de pratos acumulados antes de enviar cada pedaço da exportação
+TAMANHO_LOTE_EXPORTACAO = 500
 
 
-# Carrega todos combos possíveis para uso rápido
-TODOS_COMBOS = gerar_todos_combos(dados_cardapio)
+# Gerador que produz o cardápio em CSV, em lotes, sem montar o arquivo inteiro em memória
+def gerar_csv(cardapio: Cardapio, categoria: str = None) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(["id", "nome", "preco", "categoria"])
+    pendentes = 0
+    # Percorre a lista em memória (inclui os pratos adicionados via POST)
+    for item in cardapio.ativos():
+        if categoria and item["categoria"].lower() != categoria.lower():
+            continue
+        escritor.writerow([item["id"], item["nome"], item["preco"], item["categoria"]])
+        pendentes += 1
+        # Envia o lote acumulado e reaproveita o buffer
+        if pendentes >= TAMANHO_LOTE_EXPORTACAO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendentes = 0
+    # Envia o que sobrou (ou apenas o cabeçalho, se não houver pratos)
+    if buffer.tell():
+        yield buffer.getvalue()
 
 
-# Endpoint que retorna combos diversos sem repetir pratos entre eles
-@app.get("/cardapio/combos-diversidade", tags=["Combos"])
-def combos_diversidade(qtd: int = Query(10, ge=1, le=50, description="Quantidade de combos a retornar")):
+# Gerador que produz o cardápio em NDJSON (um objeto JSON por linha), em lotes
+def gerar_ndjson(cardapio: Cardapio, categoria: str = None) -> Iterator[str]:
+    lote: List[str] = []
+    for item in cardapio.ativos():
+        if categoria and item["categoria"].lower() != categoria.lower():
+            continue
+        lote.append(json.dumps(item, ensure_ascii=False) + "\n")
+        if len(lote) >= TAMANHO_LOTE_EXPORTACAO:
+            yield "".join(lote)
+            lote = []
+    if lote:
+        yield "".join(lote)
+
+
+# Endpoint que exporta o cardápio atual em CSV ou NDJSON, enviando os bytes conforme são gerados
+@rotas.get("/dados/exportar", tags=["Dados"])
+def exportar_cardapio(formato: Literal["csv", "ndjson"] = "csv", categoria: str = None, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Escolhe o gerador e o tipo de conteúdo conforme o formato pedido
+    if formato == "csv":
+        gerador, tipo, extensao = gerar_csv(cardapio, categoria), "text/csv; charset=utf-8", "csv"
+    else:
+        gerador, tipo, extensao = gerar_ndjson(cardapio, categoria), "application/x-ndjson; charset=utf-8", "ndjson"
+    # Sugere um nome de arquivo para download
+    cabecalhos = {"Content-Disposition": f'attachment; filename="cardapio.{extensao}"'}
+    return StreamingResponse(gerador, media_type=tipo, headers=cabecalhos)
+
+
+# Seleciona combos diversos sem repetir pratos entre eles
+def selecionar_combos(cardapio: Cardapio, qtd: int) -> Dict[str, Any]:
     # Caso não tenha combos gerados, retorna erro 500
-    if not TODOS_COMBOS:
+    if not cardapio.tem_combos():
         raise HTTPException(status_code=500, detail="Não foi possível gerar combos a partir do cardápio.")
     
     usados: set[int] = set()  # Guarda IDs dos pratos já usados para evitar repetição
     selecionados: List[Dict[str, Any]] = []
     
     # Percorre todos os combos ordenados por preço e ID para selecionar os primeiros sem repetição
-    for a, b, total in TODOS_COMBOS:
+    for a, b, total in cardapio.combos_validos():
         if a["id"] in usados or b["id"] in usados:
             continue  # Ignora combos que tenham pratos já usados
         # Adiciona os combos selecionados com seus pratos, categorias e preço total arredondado
@@ -185,20 +764,111 @@ def combos_diversidade(qtd: int = Query(10, ge=1, le=50, description="Quantidade
     }
 
 
+# Endpoint que retorna combos diversos sem repetir pratos entre eles
+@rotas.get("/cardapio/combos-diversidade", tags=["Combos"])
+def combos_diversidade(
+    request: Request,
+    qtd: int = Query(10, ge=1, le=50, description="Quantidade de combos a retornar"),
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    # A seleção só é refeita quando os dados mudam; o corpo comprimido fica em cache por quantidade
+    return resposta_comprimida(request, cardapio, ("combos", qtd), lambda: selecionar_combos(cardapio, qtd))
+
+
+# Valida os percentis pedidos na query string
+def validar_percentis(percentis: List[float]) -> List[float]:
+    for p in percentis:
+        if not 0 <= p <= 100:
+            raise HTTPException(status_code=400, detail=f"Percentil {p:g} inválido: use valores entre 0 e 100.")
+    return percentis
+
+
+# Endpoint com estatísticas de preço do cardápio inteiro e de cada categoria
+@rotas.get("/cardapio/estatisticas", tags=["Estatísticas"])
+def estatisticas_cardapio(
+    percentis: List[float] = Query(list(PERCENTIS_PADRAO), description="Percentis de preço a calcular"),
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    percentis = validar_percentis(percentis)
+    # Os agregados já estão prontos: a resposta não percorre os pratos, só lê O(categorias) valores,
+    # com a trava para que nenhuma alteração mude as listas ordenadas (ou remova uma categoria) no meio da leitura
+    with cardapio.trava:
+        return cardapio.estatisticas.resumo(percentis)
+
+
+# Endpoint com estatísticas de preço de uma categoria, ignorando letras maiúsculas/minúsculas
+@rotas.get("/cardapio/estatisticas/{categoria}", tags=["Estatísticas"])
+def estatisticas_categoria(
+    categoria: str,
+    percentis: List[float] = Query(list(PERCENTIS_PADRAO), description="Percentis de preço a calcular"),
+    cardapio: Cardapio = Depends(cardapio_da_requisicao),
+):
+    percentis = validar_percentis(percentis)
+    with cardapio.trava:
+        resumo = cardapio.estatisticas.resumo_categoria(categoria, percentis)
+    if resumo is None:
+        raise HTTPException(status_code=404, detail=f"Categoria {categoria} não encontrada")
+    return resumo
+
+
 # Endpoint POST para adicionar um novo prato ao cardápio
-@app.post("/dados", response_model=Prato, status_code=201, tags=["Dados"])
-def adicionar_prato(novo_prato: Prato):
-    # Verifica se o ID informado já existe para evitar duplicação
-    if any(prato["id"] == novo_prato.id for prato in dados_cardapio):
+@rotas.post("/dados", response_model=Prato, status_code=201, tags=["Dados"])
+def adicionar_prato(novo_prato: Prato, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Adiciona o novo prato em memória, atualizando índices, combos, estatísticas e a versão dos dados
+    try:
+        cardapio.adicionar(novo_prato.dict())
+    except PratoDuplicado:
+        # O ID informado já existe: evita duplicação
         raise HTTPException(status_code=400, detail=f"ID {novo_prato.id} já existe.")
     
-    # Adiciona o novo prato na lista em memória
-    dados_cardapio.append(novo_prato.dict())
-    
     # Nota: persistência no CSV não está implementada
     return novo_prato
 
 
+# Endpoint PUT para substituir todos os dados de um prato existente
+@rotas.put("/dados/id/{item_id}", response_model=Prato, tags=["Dados"])
+def substituir_prato(item_id: int, prato: Prato, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # O ID do corpo precisa ser o mesmo da URL (o ID não pode ser alterado)
+    if prato.id != item_id:
+        raise HTTPException(status_code=400, detail=f"ID do corpo ({prato.id}) diferente do ID da URL ({item_id}).")
+    try:
+        return cardapio.atualizar(item_id, prato.dict())
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado")
+
+
+# Endpoint PATCH para alterar apenas alguns campos de um prato
+@rotas.patch("/dados/id/{item_id}", response_model=Prato, tags=["Dados"])
+def alterar_prato(item_id: int, alteracoes: PratoParcial, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    # Considera apenas os campos enviados no corpo
+    campos = {campo: valor for campo, valor in alteracoes.dict(exclude_unset=True).items() if valor is not None}
+    try:
+        return cardapio.atualizar(item_id, campos)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado")
+
+
+# Endpoint DELETE para remover um prato (o espaço é recuperado depois, pela compactação em segundo plano)
+@rotas.delete("/dados/id/{item_id}", status_code=204, tags=["Dados"])
+def remover_prato(item_id: int, cardapio: Cardapio = Depends(cardapio_da_requisicao)):
+    try:
+        cardapio.remover(item_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Item com ID {item_id} não encontrado")
+    return Response(status_code=204)
+
+
+# Endpoint com os restaurantes em memória e o uso estimado frente ao orçamento
+@app.get("/restaurantes", tags=["Restaurantes"])
+def listar_restaurantes_carregados():
+    return RESTAURANTES.resumo()
+
+
+# Registra as rotas do cardápio padrão e as mesmas rotas para cada restaurante
+app.include_router(rotas)
+app.include_router(rotas, prefix="/restaurantes/{restaurante}", tags=["Restaurantes"])
+
+
 # Quando rodar esse arquivo diretamente, inicia o servidor Uvicorn
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,278 @@
+# Recomendação de pratos semelhantes.
+# Cada prato vira um vetor com TF-IDF de n-gramas de caracteres do nome, a categoria e o preço.
+# Os vizinhos mais próximos de todos os pratos são calculados de uma vez (em lote) e gravados com
+# joblib, identificados pelo hash do conteúdo do cardápio; pratos incluídos ou alterados depois
+# atualizam só os seus vizinhos e os dos pratos afetados. Uma recomendação é apenas uma consulta.
+
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any, Tuple, Optional, Set
+# Para manipular caminhos de arquivo de modo portável
+from pathlib import Path
+# Hash do conteúdo do cardápio
+import hashlib
+import json
+# Vetores e matrizes esparsas
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.neighbors import NearestNeighbors
+from sklearn.metrics.pairwise import euclidean_distances
+# Mesma normalização de nomes da busca aproximada (sem acentos nem maiúsculas)
+from busca_aproximada import normalizar
+# Gravação e leitura do modelo em disco
+from cache_derivados import carregar_ou_gerar, hash_codigo
+
+
+# Versão do código do modelo (e do scikit-learn, cujo formato gravado muda entre versões)
+VERSAO_CODIGO = hash_codigo("recomendacao", "busca_aproximada", extras=(sklearn.__version__,))
+
+# Quantos vizinhos são recomendados por prato
+VIZINHOS_POR_PRATO = 10
+# Quantos são guardados: com a reserva, um prato removido da lista não obriga a recalculá-la
+RESERVA_VIZINHOS = 2
+
+# Peso da categoria e do preço em relação ao nome (o vetor do nome tem norma 1)
+PESO_CATEGORIA = 0.5
+PESO_PRECO = 0.5
+
+# Linhas pendentes (ou inativas) acumuladas até a consolidação da matriz: o maior entre o mínimo e a fração das linhas
+MINIMO_CONSOLIDACAO = 256
+FRACAO_CONSOLIDACAO = 0.1
+
+# Estimativas de memória das estruturas Python do modelo (ID e posição de cada linha; cada vizinho guardado,
+# com a tupla na lista e a entrada no índice reverso)
+BYTES_POR_LINHA = 150
+BYTES_POR_VIZINHO = 150
+
+
+# Característica de preço: log do preço (diferenças relativas importam mais que absolutas)
+# Preços negativos não chegam pela API nem pelo CSV; se chegarem, viram zero em vez de NaN/-inf na matriz
+def log_preco(precos: List[float]) -> np.ndarray:
+    return np.log1p(np.maximum(np.asarray(precos, dtype=float), 0.0))
+
+
+# Hash do conteúdo do cardápio (IDs, nomes, preços e categorias, na ordem dos IDs)
+def hash_cardapio(itens: List[Dict[str, Any]]) -> str:
+    conteudo = sorted((item["id"], item["nome"], item["preco"], item["categoria"]) for item in itens)
+    return hashlib.sha256(json.dumps(conteudo, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# Modelo de pratos semelhantes de um cardápio
+# As linhas da matriz são versões de pratos: incluir ou alterar um prato acrescenta uma linha (em
+# 'pendentes', sem copiar a matriz) e a versão anterior só é marcada como inativa. De tempos em tempos
+# as pendentes entram na matriz e as inativas são descartadas (consolidação).
+class ModeloSemelhantes:
+    def __init__(self, itens: List[Dict[str, Any]], vizinhos_por_prato: int = VIZINHOS_POR_PRATO):
+        self.k = vizinhos_por_prato
+        self.guardados = vizinhos_por_prato * RESERVA_VIZINHOS
+        self.vetorizador = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), preprocessor=normalizar)
+        nomes = [item["nome"] for item in itens]
+        # Cardápio vazio: um nome qualquer só para o vocabulário não ficar vazio (o TF-IDF recusa)
+        self.vetorizador.fit(nomes or ["prato"])
+        self.categorias = {c: i for i, c in enumerate(sorted({item["categoria"].lower() for item in itens}))}
+        precos = log_preco([item["preco"] for item in itens]) if itens else np.zeros(1)
+        self.escala_preco = float(np.std(precos)) or 1.0
+
+        self.ids: List[int] = [item["id"] for item in itens]  # Linha -> ID (inclusive linhas inativas)
+        self.linhas: Dict[int, int] = {item_id: i for i, item_id in enumerate(self.ids)}  # ID -> linha atual
+        self.matriz = self._vetorizar(itens)
+        self.pendentes: List[sp.csr_matrix] = []  # Linhas acrescentadas depois da última consolidação
+        self._empilhadas: Optional[sp.csr_matrix] = None  # 'pendentes' numa matriz só (refeita quando muda)
+        # Por linha (com folga para as próximas): ainda é a versão atual do prato?
+        # e a nota do último vizinho da lista (-1 enquanto a lista não está cheia)
+        self.ativa = np.ones(len(self.ids), dtype=bool)
+        self.pior = np.full(len(self.ids), -1.0)
+        self.inativas = 0
+        self.vizinhos: Dict[int, List[Tuple[int, float]]] = {}
+        self.citado_por: Dict[int, Set[int]] = {}  # Índice reverso: ID -> pratos que o têm na lista
+        self._calcular_vizinhos_em_lote()
+
+    # Monta os vetores: [TF-IDF do nome | categoria (one-hot) | log do preço], com os pesos definidos acima
+    def _vetorizar(self, itens: List[Dict[str, Any]]) -> sp.csr_matrix:
+        if not itens:
+            return sp.csr_matrix((0, len(self.vetorizador.vocabulary_) + len(self.categorias) + 1))
+        nomes = self.vetorizador.transform([item["nome"] for item in itens])
+        categorias = sp.lil_matrix((len(itens), len(self.categorias)))
+        for i, item in enumerate(itens):
+            coluna = self.categorias.get(item["categoria"].lower())
+            if coluna is not None:  # Categoria nova (criada depois do modelo) fica sem coluna
+                categorias[i, coluna] = PESO_CATEGORIA
+        precos = log_preco([[item["preco"]] for item in itens]) / self.escala_preco * PESO_PRECO
+        return sp.hstack([nomes, categorias.tocsr(), sp.csr_matrix(precos)]).tocsr()
+
+    # Calcula os vizinhos de todos os pratos de uma vez
+    def _calcular_vizinhos_em_lote(self) -> None:
+        if len(self.ids) < 2:
+            for item_id in self.ids:
+                self._definir(item_id, [])
+            return
+        busca = NearestNeighbors(n_neighbors=min(self.guardados + 1, len(self.ids)), metric="euclidean")
+        busca.fit(self.matriz)
+        distancias, indices = busca.kneighbors(self.matriz)
+        for linha, item_id in enumerate(self.ids):
+            self._definir(item_id, [
+                (self.ids[j], self._nota(d)) for d, j in zip(distancias[linha], indices[linha]) if j != linha
+            ][:self.guardados])
+
+    # Converte a distância em uma nota de semelhança entre 0 e 1
+    @staticmethod
+    def _nota(distancia: float) -> float:
+        return round(1.0 / (1.0 + float(distancia)), 4)
+
+    # Troca a lista de vizinhos de um prato mantendo o índice reverso e a pior nota da linha
+    # A lista é sempre a dos pratos mais parecidos, com pelo menos k deles (ou todos, se o cardápio é menor)
+    def _definir(self, item_id: int, lista: List[Tuple[int, float]]) -> None:
+        for outro_id, _ in self.vizinhos.get(item_id, ()):
+            citantes = self.citado_por.get(outro_id)
+            if citantes is not None:
+                citantes.discard(item_id)
+        for outro_id, _ in lista:
+            self.citado_por.setdefault(outro_id, set()).add(item_id)
+        self.vizinhos[item_id] = lista
+        self.pior[self.linhas[item_id]] = lista[-1][1] if len(lista) >= self.k else -1.0
+
+    # Vetor de uma linha (da matriz consolidada ou das pendentes)
+    def _vetor(self, linha: int) -> sp.csr_matrix:
+        base = self.matriz.shape[0]
+        return self.matriz[linha] if linha < base else self.pendentes[linha - base]
+
+    # Nota de semelhança do vetor com cada linha (-inf nas linhas inativas), num único cálculo vetorizado
+    def _notas(self, vetor: sp.csr_matrix) -> np.ndarray:
+        partes = [euclidean_distances(self.matriz, vetor).ravel()] if self.matriz.shape[0] else [np.empty(0)]
+        if self.pendentes:
+            if self._empilhadas is None:
+                self._empilhadas = sp.vstack(self.pendentes).tocsr()
+            partes.append(euclidean_distances(self._empilhadas, vetor).ravel())
+        notas = np.round(1.0 / (1.0 + np.concatenate(partes)), 4)
+        notas[~self.ativa[:len(self.ids)]] = -np.inf
+        return notas
+
+    # Os pratos de maior nota, com a reserva (sem ordenar todas as linhas)
+    def _melhores(self, notas: np.ndarray) -> List[Tuple[int, float]]:
+        qtd = min(self.guardados, int(np.count_nonzero(np.isfinite(notas))))
+        if qtd == 0:
+            return []
+        escolhidas = np.argpartition(-notas, qtd - 1)[:qtd]
+        return sorted(((self.ids[j], float(notas[j])) for j in escolhidas), key=lambda par: -par[1])
+
+    # Recalcula a lista de vizinhos de um prato do zero
+    def _recalcular(self, item_id: int) -> None:
+        linha = self.linhas[item_id]
+        notas = self._notas(self._vetor(linha))
+        notas[linha] = -np.inf
+        self._definir(item_id, self._melhores(notas))
+
+    # Acrescenta a linha de um prato (sem copiar a matriz; 'ativa' e 'pior' crescem com folga)
+    def _nova_linha(self, item_id: int, vetor: sp.csr_matrix) -> int:
+        linha = len(self.ids)
+        if linha >= len(self.ativa):
+            folga = max(16, len(self.ativa))
+            self.ativa = np.concatenate([self.ativa, np.zeros(folga, dtype=bool)])
+            self.pior = np.concatenate([self.pior, np.full(folga, -1.0)])
+        self.ids.append(item_id)
+        self.linhas[item_id] = linha
+        self.ativa[linha] = True
+        self.pior[linha] = -1.0
+        self.pendentes.append(vetor)
+        self._empilhadas = None
+        return linha
+
+    # Marca como inativa a linha atual do prato e tira o prato das listas onde aparecia (pelo índice
+    # reverso, sem percorrer as listas). Devolve os pratos cujas listas ficaram com menos de k vizinhos
+    def _desativar(self, item_id: int) -> Set[int]:
+        self.ativa[self.linhas[item_id]] = False
+        self.inativas += 1
+        incompletos = set()
+        for outro_id in self.citado_por.pop(item_id, set()):
+            lista = [par for par in self.vizinhos[outro_id] if par[0] != item_id]
+            self._definir(outro_id, lista)
+            if len(lista) < self.k:
+                incompletos.add(outro_id)
+        return incompletos
+
+    # Inclui (ou recalcula) um prato: calcula seus vizinhos e entra na lista dos pratos de quem ficou mais perto
+    def adicionar(self, item: Dict[str, Any]) -> None:
+        item_id = item["id"]
+        afetados = self._desativar(item_id) if item_id in self.linhas else set()
+        vetor = self._vetorizar([item])
+        linha = self._nova_linha(item_id, vetor)
+
+        notas = self._notas(vetor)
+        notas[linha] = -np.inf
+        self._definir(item_id, self._melhores(notas))
+
+        # As listas que ficaram curtas sem a versão antiga são recalculadas
+        for outro_id in afetados:
+            self._recalcular(outro_id)
+
+        # O prato novo entra só nas listas cujo pior vizinho ele supera (comparação vetorizada); as demais
+        # continuam sendo as dos pratos mais parecidos
+        for j in np.nonzero(notas > self.pior[:len(notas)])[0]:
+            outro_id = self.ids[j]
+            if outro_id in afetados:
+                continue  # Já recalculado acima, com o prato incluído
+            lista = self.vizinhos[outro_id] + [(item_id, float(notas[j]))]
+            lista.sort(key=lambda par: -par[1])
+            self._definir(outro_id, lista[:self.guardados])
+
+        self._consolidar_se_preciso()
+
+    # Remove um prato: ele deixa de ser recomendado e de receber recomendações
+    # As listas de onde ele saiu seguem com a reserva; só as que ficam com menos de k são recalculadas
+    def remover(self, item_id: int) -> None:
+        if item_id not in self.linhas:
+            return
+        afetados = self._desativar(item_id)
+        self._definir(item_id, [])
+        del self.vizinhos[item_id]
+        del self.linhas[item_id]
+        for outro_id in afetados:
+            self._recalcular(outro_id)
+        self._consolidar_se_preciso()
+
+    # Junta as pendentes à matriz e descarta as linhas inativas quando já são muitas
+    def _consolidar_se_preciso(self) -> None:
+        limite = max(MINIMO_CONSOLIDACAO, int(FRACAO_CONSOLIDACAO * len(self.ids)))
+        if len(self.pendentes) < limite and self.inativas < limite:
+            return
+        manter = np.nonzero(self.ativa[:len(self.ids)])[0]
+        todas = sp.vstack([self.matriz] + self.pendentes).tocsr() if self.pendentes else self.matriz
+        self.matriz = todas[manter]
+        self.ids = [self.ids[j] for j in manter]
+        self.linhas = {item_id: i for i, item_id in enumerate(self.ids)}
+        self.pendentes = []
+        self._empilhadas = None
+        self.ativa = np.ones(len(self.ids), dtype=bool)
+        self.pior = np.full(len(self.ids), -1.0)
+        self.inativas = 0
+        for item_id, lista in self.vizinhos.items():
+            if len(lista) >= self.k:
+                self.pior[self.linhas[item_id]] = lista[-1][1]
+
+    # Estimativa da memória ocupada pelo modelo (sem percorrer as listas: conta a reserva inteira)
+    def memoria_estimada(self) -> int:
+        matriz = self.matriz.data.nbytes + self.matriz.indices.nbytes + self.matriz.indptr.nbytes
+        # Linhas pendentes: mesmo tamanho médio das linhas da matriz
+        por_linha = matriz / max(1, self.matriz.shape[0])
+        return int(matriz + len(self.pendentes) * por_linha + self.ativa.nbytes + self.pior.nbytes
+                   + len(self.ids) * BYTES_POR_LINHA + len(self.vizinhos) * self.guardados * BYTES_POR_VIZINHO)
+
+    # Aplica uma alteração do cardápio (formato publicado por Cardapio._registrar)
+    def aplicar(self, alteracao: Dict[str, Any]) -> None:
+        if alteracao["tipo"] == "remocao":
+            self.remover(alteracao["id"])
+        else:
+            self.adicionar(alteracao["prato"])
+
+    # Pratos semelhantes já calculados: lista de (id, nota), da maior nota para a menor
+    def semelhantes(self, item_id: int, qtd: int = VIZINHOS_POR_PRATO) -> Optional[List[Tuple[int, float]]]:
+        lista = self.vizinhos.get(item_id)
+        return None if lista is None else lista[:min(qtd, self.k)]
+
+
+# Carrega o modelo gravado para este conteúdo de cardápio ou constrói (e grava) um novo
+# 'nome' identifica o cardápio: os modelos gravados antes para ele (conteúdo ou código antigo) são apagados
+def carregar_ou_construir(itens: List[Dict[str, Any]], pasta: Path, nome: str) -> ModeloSemelhantes:
+    caminho = pasta / f"semelhantes-{nome}.{hash_cardapio(itens)[:16]}.{VERSAO_CODIGO[:16]}.joblib"
+    return carregar_ou_gerar(caminho, lambda: ModeloSemelhantes(itens), antigos=f"semelhantes-{nome}.*.joblib")
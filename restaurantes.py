@@ -0,0 +1,180 @@
+# Cardápios de vários restaurantes no mesmo processo.
+# Cada restaurante é carregado (CSV, índices e combos) só no primeiro acesso e fica em memória enquanto
+# houver espaço; quando o uso estimado passa do orçamento, os menos usados recentemente são descartados.
+
+# Tipos genéricos para tipagem das funções
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+# Dicionário que mantém a ordem de uso (o primeiro é o menos usado recentemente)
+from collections import OrderedDict
+# Travas para o controle do LRU e para não carregar o mesmo restaurante duas vezes
+import threading
+# Validação do identificador do restaurante
+import re
+# Cardápio em memória de um restaurante
+from cardapio import Cardapio
+
+
+# Orçamento padrão de memória para os cardápios carregados (em MB)
+MEMORIA_MAXIMA_PADRAO_MB = 512
+
+# Estimativas de memória usadas no orçamento (dicionário do prato, strings, índices e trigramas; tupla do combo)
+BYTES_POR_PRATO = 1200
+BYTES_POR_COMBO = 100
+
+# Identificadores aceitos: evita caminhos como '../' ao montar o nome do arquivo
+_IDENTIFICADOR_VALIDO = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+# Indica se o identificador do restaurante é válido
+def restaurante_valido(restaurante: str) -> bool:
+    return bool(_IDENTIFICADOR_VALIDO.match(restaurante))
+
+
+# Estimativa da memória ocupada por um cardápio e suas estruturas derivadas
+# Inclui o que cresce depois da carga: pratos e combos incluídos via API e os corpos de resposta em cache
+def memoria_estimada(cardapio: Cardapio) -> int:
+    pratos_e_combos = len(cardapio.itens) * BYTES_POR_PRATO + (len(cardapio.combos) + cardapio.total_combos_novos) * BYTES_POR_COMBO
+    # Cópias das listas: o cache pode ganhar entradas em outras threads durante a soma
+    corpos = sum(len(corpo) for _, por_codificacao in list(cardapio.cache.values()) for corpo in list(por_codificacao.values()))
+    return pratos_e_combos + corpos
+
+
+# Mantém os cardápios carregados com política LRU e orçamento de memória
+# O tamanho estimado de cada cardápio é guardado e só é medido de novo quando ele cresce (alterações,
+# respostas em cache, modelos): um acesso comum não percorre os restaurantes carregados
+class GerenciadorCardapios:
+    def __init__(
+        self,
+        carregar: Callable[[str], Cardapio],
+        memoria_maxima_mb: float = MEMORIA_MAXIMA_PADRAO_MB,
+        ao_descartar: Optional[Callable[[str, Cardapio], None]] = None,
+        memoria_adicional: Optional[Callable[[Cardapio], int]] = None,
+    ):
+        self.carregar = carregar                      # Monta o cardápio de um restaurante (lança FileNotFoundError se não existir)
+        self.memoria_maxima = int(memoria_maxima_mb * 1024 * 1024)
+        self.ao_descartar = ao_descartar              # Chamado para cada restaurante descartado
+        self.memoria_adicional = memoria_adicional    # Memória de estruturas mantidas fora do cardápio (ex.: modelos)
+        self.cardapios: "OrderedDict[str, Cardapio]" = OrderedDict()
+        self.tamanhos: Dict[str, int] = {}            # Última memória estimada de cada restaurante
+        self.total = 0                                # Soma de self.tamanhos
+        self.trava = threading.Lock()
+        self._travas_carga: Dict[str, threading.Lock] = {}
+        self._restaurantes: Dict[str, str] = {}       # Instância do cardápio -> restaurante
+        self._crescidos: Set[str] = set()             # Instâncias que mudaram de tamanho desde a última medição
+
+    # Memória estimada de um cardápio mais a das estruturas mantidas fora dele
+    def _memoria(self, cardapio: Cardapio) -> int:
+        adicional = self.memoria_adicional(cardapio) if self.memoria_adicional is not None else 0
+        return memoria_estimada(cardapio) + adicional
+
+    # Avisa que o cardápio mudou de tamanho: ele é medido de novo (e o orçamento conferido) no próximo acesso
+    # Sem trava (incluir em um set é atômico): pode ser chamado de qualquer thread, inclusive por ouvintes
+    # do cardápio; cardápios que não são deste gerenciador são ignorados na medição
+    def registrar_crescimento(self, cardapio: Cardapio) -> None:
+        self._crescidos.add(cardapio.instancia)
+
+    # Devolve o cardápio do restaurante, carregando-o se necessário
+    def obter(self, restaurante: str) -> Cardapio:
+        with self.trava:
+            cardapio = self.cardapios.get(restaurante)
+            if cardapio is not None:
+                self.cardapios.move_to_end(restaurante)  # Marca como usado agora
+                descartados = self._conferir_orcamento(manter=restaurante)
+            else:
+                trava_carga = self._travas_carga.setdefault(restaurante, threading.Lock())
+        if cardapio is not None:
+            self._avisar_descartados(descartados)
+            return cardapio
+
+        # A carga roda fora da trava geral: outros restaurantes continuam sendo atendidos
+        # e requisições simultâneas ao mesmo restaurante esperam uma única carga
+        with trava_carga:
+            with self.trava:
+                cardapio = self.cardapios.get(restaurante)
+                if cardapio is not None:
+                    self.cardapios.move_to_end(restaurante)
+                    descartados = self._conferir_orcamento(manter=restaurante)
+            if cardapio is not None:
+                self._avisar_descartados(descartados)
+                return cardapio
+            try:
+                cardapio = self.carregar(restaurante)
+            except Exception:
+                with self.trava:
+                    self._travas_carga.pop(restaurante, None)
+                raise
+
+            # Cada alteração pode aumentar o cardápio (pratos, combos, modelos atualizados)
+            def ao_alterar(alteracao: Dict[str, Any]) -> None:
+                self.registrar_crescimento(cardapio)
+
+            cardapio.ouvintes.append(ao_alterar)
+            with self.trava:
+                self.cardapios[restaurante] = cardapio
+                self._restaurantes[cardapio.instancia] = restaurante
+                self._medir(restaurante)
+                self._travas_carga.pop(restaurante, None)
+                descartados = self._liberar_memoria(manter=restaurante)
+
+        self._avisar_descartados(descartados)
+        return cardapio
+
+    # Chama 'ao_descartar' para os descartados (fora da trava: pode encerrar conexões)
+    def _avisar_descartados(self, descartados: List[Tuple[str, Cardapio]]) -> None:
+        if self.ao_descartar is not None:
+            for nome, descartado in descartados:
+                self.ao_descartar(nome, descartado)
+
+    # Atualiza a memória estimada de um restaurante e o total (chamado com a trava)
+    def _medir(self, restaurante: str) -> None:
+        tamanho = self._memoria(self.cardapios[restaurante])
+        self.total += tamanho - self.tamanhos.get(restaurante, 0)
+        self.tamanhos[restaurante] = tamanho
+
+    # Mede de novo os cardápios que cresceram; indica se havia algum (chamado com a trava)
+    def _medir_crescidos(self) -> bool:
+        medidos = False
+        while self._crescidos:
+            restaurante = self._restaurantes.get(self._crescidos.pop())
+            if restaurante is not None:
+                self._medir(restaurante)
+                medidos = True
+        return medidos
+
+    # Confere o orçamento só se algum cardápio mudou de tamanho desde a última conferência (chamado com a trava)
+    def _conferir_orcamento(self, manter: str) -> List[Tuple[str, Cardapio]]:
+        if not self._medir_crescidos():
+            return []
+        return self._liberar_memoria(manter)
+
+    # Descarta os menos usados até caber no orçamento (chamado com a trava)
+    # Cardápios sem alterações saem primeiro; os alterados (que perderiam as mudanças) só se ainda faltar espaço
+    def _liberar_memoria(self, manter: str) -> List[Tuple[str, Cardapio]]:
+        descartados: List[Tuple[str, Cardapio]] = []
+        for so_sem_alteracoes in (True, False):
+            for nome in list(self.cardapios):
+                if self.total <= self.memoria_maxima:
+                    return descartados
+                cardapio = self.cardapios[nome]
+                if nome == manter or (so_sem_alteracoes and cardapio.versao > 0):
+                    continue
+                del self.cardapios[nome]
+                del self._restaurantes[cardapio.instancia]
+                self.total -= self.tamanhos.pop(nome)
+                descartados.append((nome, cardapio))
+                if cardapio.versao > 0:
+                    print(f"Restaurante {nome} descartado da memória com {cardapio.versao} alteração(ões) não persistida(s)")
+        return descartados
+
+    # Resumo dos restaurantes em memória, do menos para o mais usado recentemente
+    def resumo(self) -> Dict[str, Any]:
+        with self.trava:
+            self._medir_crescidos()
+            carregados = [{"restaurante": nome, "pratos": len(c), "memoria_estimada_mb": round(self.tamanhos[nome] / 1024 / 1024, 2)}
+                          for nome, c in self.cardapios.items()]
+            total = self.total
+        return {
+            "carregados": carregados,
+            "memoria_estimada_mb": round(total / 1024 / 1024, 2),
+            "memoria_maxima_mb": round(self.memoria_maxima / 1024 / 1024, 2),
+        }
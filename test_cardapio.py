@@ -0,0 +1,145 @@
+# Testes do cardápio em memória: depois de qualquer sequência de inclusões, alterações, remoções
+# e compactações, as estruturas mantidas de forma incremental (combos, índices e estatísticas)
+# devem ser iguais às montadas do zero a partir dos pratos ativos.
+
+# Sequências de alterações aleatórias, mas reproduzíveis
+import random
+# Limite de blocos de combos novos
+import math
+# Espera pela compactação em segundo plano e compactação concorrente
+import time
+import threading
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any
+
+import pytest
+
+import cardapio as modulo_cardapio
+from cardapio import Cardapio, PratoDuplicado, gerar_todos_combos, chave_combo
+from busca_aproximada import IndiceBusca
+from estatisticas import EstatisticasCardapio
+
+
+CATEGORIAS = ["Pizza", "Lanches", "Saladas", "Bebidas"]
+
+
+def prato(aleatorio: random.Random, item_id: int) -> Dict[str, Any]:
+    return {"id": item_id, "nome": f"Prato {aleatorio.randint(1, 50)}",
+            "preco": round(aleatorio.uniform(5, 80), 2), "categoria": aleatorio.choice(CATEGORIAS)}
+
+
+# Compara as estruturas incrementais do cardápio com as montadas do zero
+def conferir(cardapio: Cardapio) -> None:
+    ativos = cardapio.listar()
+    assert len(cardapio) == len(ativos)
+    assert cardapio.itens.count(None) == cardapio.lapides
+    assert {item["id"]: item for item in ativos} == cardapio.indice_id
+
+    esperados = [chave_combo(c) for c in gerar_todos_combos(ativos)]
+    assert [chave_combo(c) for c in cardapio.combos_validos()] == esperados
+
+    assert cardapio.indice_busca.chaves == IndiceBusca(ativos).chaves
+    assert cardapio.estatisticas.resumo() == EstatisticasCardapio(ativos).resumo()
+
+
+# Aplica 'passos' alterações aleatórias (proximo_id é o próximo ID livre, atualizado aqui)
+def alterar(cardapio: Cardapio, aleatorio: random.Random, passos: int, proximo_id: List[int]) -> None:
+    for _ in range(passos):
+        ids = list(cardapio.indice_id)
+        acao = aleatorio.random()
+        if acao < 0.4 or not ids:
+            cardapio.adicionar(prato(aleatorio, proximo_id[0]))
+            proximo_id[0] += 1
+        elif acao < 0.7:
+            item_id = aleatorio.choice(ids)
+            campos = {k: v for k, v in prato(aleatorio, item_id).items() if aleatorio.random() < 0.5}
+            cardapio.atualizar(item_id, campos)
+        else:
+            cardapio.remover(aleatorio.choice(ids))
+
+
+def esperar_compactacao(cardapio: Cardapio, timeout: float = 10.0) -> None:
+    prazo = time.monotonic() + timeout
+    while cardapio._compactando:
+        assert time.monotonic() < prazo, "compactação não terminou"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_estruturas_iguais_a_reconstrucao_depois_de_alteracoes_e_compactacoes(semente):
+    aleatorio = random.Random(semente)
+    cardapio = Cardapio([prato(aleatorio, i) for i in range(60)])
+    proximo_id = [60]
+    for _ in range(6):
+        # Muitas alterações disparam compactações em segundo plano enquanto outras acontecem
+        alterar(cardapio, aleatorio, 150, proximo_id)
+        esperar_compactacao(cardapio)
+        conferir(cardapio)
+        cardapio.compactar()
+        assert cardapio.lapides == 0
+        conferir(cardapio)
+
+
+def test_compactacao_concorrente_com_alteracoes():
+    aleatorio = random.Random(42)
+    cardapio = Cardapio([prato(aleatorio, i) for i in range(80)])
+    proximo_id = [80]
+    alterar(cardapio, aleatorio, 100, proximo_id)
+    compactacao = threading.Thread(target=cardapio.compactar)
+    compactacao.start()
+    alterar(cardapio, aleatorio, 100, proximo_id)
+    compactacao.join()
+    esperar_compactacao(cardapio)
+    conferir(cardapio)
+
+
+def test_combo_com_prato_alterado_ou_removido_fica_obsoleto():
+    cardapio = Cardapio([
+        {"id": 1, "nome": "Suco", "preco": 5.0, "categoria": "Bebidas"},
+        {"id": 2, "nome": "Pizza", "preco": 30.0, "categoria": "Pizza"},
+        {"id": 3, "nome": "Salada", "preco": 20.0, "categoria": "Saladas"},
+    ])
+    cardapio.atualizar(1, {"preco": 50.0})
+    cardapio.remover(3)
+    combos = list(cardapio.combos_validos())
+    assert [(a["id"], b["id"], total) for a, b, total in combos] == [(2, 1, 80.0)]
+    assert cardapio.itens[2] is None and cardapio.lapides == 1
+
+
+def test_id_duplicado():
+    cardapio = Cardapio([{"id": 1, "nome": "Suco", "preco": 5.0, "categoria": "Bebidas"}])
+    with pytest.raises(PratoDuplicado):
+        cardapio.adicionar({"id": 1, "nome": "Outro", "preco": 6.0, "categoria": "Bebidas"})
+    assert cardapio.versao == 0
+
+
+def test_alteracao_sem_mudanca_nao_gera_versao():
+    cardapio = Cardapio([{"id": 1, "nome": "Suco", "preco": 5.0, "categoria": "Bebidas"}])
+    eventos = []
+    cardapio.ouvintes.append(eventos.append)
+    antigo = cardapio.obter(1)
+    assert cardapio.atualizar(1, {}) is antigo
+    assert cardapio.atualizar(1, {"preco": 5.0, "id": 1}) is antigo
+    assert cardapio.versao == 0 and not cardapio.historico and not eventos
+    cardapio.atualizar(1, {"preco": 6.0})
+    assert cardapio.versao == 1 and len(eventos) == 1
+
+
+def test_combos_novos_nao_sao_copiados_a_cada_alteracao(monkeypatch):
+    # Sem compactação, para os combos novos se acumularem
+    monkeypatch.setattr(modulo_cardapio, "FRACAO_COMBOS_COMPACTACAO", 1000)
+    aleatorio = random.Random(7)
+    cardapio = Cardapio([prato(aleatorio, i) for i in range(150)])
+    copiados = 0
+    for i in range(150, 450):
+        anteriores = {id(bloco) for bloco in cardapio.combos_novos}
+        cardapio.adicionar(prato(aleatorio, i))
+        # Combos copiados nesta inclusão: os dos blocos que não existiam antes dela
+        copiados += sum(len(bloco) for bloco in cardapio.combos_novos if id(bloco) not in anteriores)
+        total = cardapio.total_combos_novos
+        assert total == sum(len(bloco) for bloco in cardapio.combos_novos)
+        assert len(cardapio.combos_novos) <= math.log2(total) + 1
+
+    # Cada combo é copiado O(log) vezes, não uma vez por alteração seguinte
+    assert copiados <= total * (math.log2(total) + 1)
+    conferir(cardapio)
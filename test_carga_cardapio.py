@@ -0,0 +1,45 @@
+# Testes da carga do CSV em blocos: linhas inválidas são relatadas com o número da linha no arquivo
+# (o mesmo com um bloco só ou com vários blocos processados em paralelo) e não abortam a carga.
+
+import pytest
+
+from carga_cardapio import carregar_em_blocos
+
+
+LINHAS = [
+    b"id,nome,preco,categoria",
+    b"1,Suco,5.00,Bebidas",
+    b"2,Pizza,abc,Pizza",          # linha 3: preço inválido
+    b"3,Salada,20.00,Saladas",
+    b"",                           # linha 5: em branco (ignorada)
+    b"4,Lanche,15.00",             # linha 6: coluna faltando
+    b"5,P\xe3o,3.50,Lanches",      # linha 7: Latin-1, não é UTF-8
+    b"1,Repetido,9.00,Bebidas",    # linha 8: ID repetido
+    b"6,P\xc3\xa3o de Queijo,4.00,Lanches",
+    b"2,\xff\xfe,3,Y",             # linha 10: bytes inválidos
+    b"7,Pudim,8.00,Sobremesas",
+]
+
+ERROS_ESPERADOS = [3, 6, 7, 8, 10]
+
+
+@pytest.fixture
+def csv_com_erros(tmp_path):
+    caminho = tmp_path / "cardapio.csv"
+    caminho.write_bytes(b"\n".join(LINHAS) + b"\n")
+    return caminho
+
+
+def test_linhas_invalidas_em_um_bloco(csv_com_erros):
+    itens, erros = carregar_em_blocos(csv_com_erros)
+    assert [item["id"] for item in itens] == [1, 3, 6, 7]
+    assert itens[2]["nome"] == "Pão de Queijo"
+    assert [erro["linha"] for erro in erros] == ERROS_ESPERADOS
+    assert "UTF-8" in erros[2]["erro"] and "UTF-8" in erros[4]["erro"]
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 30, 64])
+def test_numero_da_linha_igual_com_varios_blocos(csv_com_erros, tamanho_bloco):
+    esperado = carregar_em_blocos(csv_com_erros)
+    paralelo = carregar_em_blocos(csv_com_erros, tamanho_bloco=tamanho_bloco, processos=2, limite_paralelo=0)
+    assert paralelo == esperado
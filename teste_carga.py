@@ -0,0 +1,254 @@
+# Teste de carga HTTP da API do cardápio.
+# Gera um cardápio sintético, sobe a aplicação com uvicorn em uma porta local, dispara requisições
+# concorrentes em cada endpoint e mede vazão (requisições/s) e latências p50/p95/p99.
+# Compara com uma linha de base salva e termina com erro se algum endpoint piorar além da tolerância.
+#
+# Uso:
+#   python teste_carga.py                       # roda e compara com teste_carga_baseline.json (se existir)
+#   python teste_carga.py --salvar-baseline     # roda e grava os resultados como nova linha de base
+#   python teste_carga.py --pratos 2000 --concorrencia 32 --duracao 10
+
+# Leitura dos parâmetros da linha de comando
+import argparse
+# Cliente HTTP da biblioteca padrão (conexões persistentes, uma por thread)
+import http.client
+# Leitura e escrita da linha de base e dos corpos das requisições
+import json
+# Geração do cardápio sintético
+import random
+import csv
+# Processo do servidor e variáveis de ambiente
+import subprocess
+import sys
+import os
+# Threads que simulam os clientes concorrentes
+import threading
+# Medição de tempo
+import time
+# Pasta temporária para o CSV gerado
+import tempfile
+# Contador de IDs únicos para os POSTs
+import itertools
+# Tipos genéricos para tipagem das funções
+from typing import List, Dict, Any, Callable, Tuple
+# Para manipular caminhos de arquivo de modo portável
+from pathlib import Path
+
+
+# Pasta do projeto (onde está o main.py)
+PASTA_PROJETO = Path(__file__).parent
+
+# Arquivo padrão da linha de base
+ARQUIVO_BASELINE = PASTA_PROJETO / "teste_carga_baseline.json"
+
+# Categorias e nomes usados no cardápio sintético
+CATEGORIAS = ["Pizza", "Lanches", "Saladas", "Massas", "Sobremesas", "Bebidas", "Porções", "Pratos Executivos"]
+NOMES = ["Pão de Queijo", "Strogonoff", "Margherita", "Caesar", "Lasanha", "Açaí", "X-Burger", "Suco", "Feijoada", "Brigadeiro"]
+
+
+# Gera o CSV do cardápio sintético e devolve o caminho
+def gerar_cardapio(pasta: Path, pratos: int, semente: int = 42) -> Path:
+    aleatorio = random.Random(semente)
+    caminho = pasta / "cardapio_carga.csv"
+    with caminho.open("w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["id", "nome", "preco", "categoria"])
+        for i in range(1, pratos + 1):
+            escritor.writerow([i, f"{aleatorio.choice(NOMES)} {i}", round(aleatorio.uniform(5, 120), 2), aleatorio.choice(CATEGORIAS)])
+    return caminho
+
+
+# Sobe a API com uvicorn apontando para o CSV gerado e espera ela responder
+# O cache de estruturas derivadas fica na pasta temporária: não toca no cache/ do projeto
+def iniciar_servidor(csv_cardapio: Path, porta: int, timeout: float = 60.0) -> subprocess.Popen:
+    ambiente = dict(os.environ, CARDAPIO_CSV=str(csv_cardapio), CARDAPIO_PASTA_CACHE=str(csv_cardapio.parent / "cache"))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(porta), "--log-level", "warning"],
+        cwd=PASTA_PROJETO, env=ambiente,
+    )
+    prazo = time.monotonic() + timeout
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(f"O servidor terminou durante a inicialização (código {processo.returncode})")
+        try:
+            conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=2)
+            conexao.request("GET", "/")
+            if conexao.getresponse().status == 200:
+                conexao.close()
+                return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("O servidor não respondeu dentro do tempo limite")
+
+
+# Cenários do teste: nome -> função que devolve (método, caminho, corpo) de cada requisição
+def montar_cenarios(pratos: int) -> Dict[str, Callable[[random.Random], Tuple[str, str, Any]]]:
+    proximo_id = itertools.count(pratos + 1_000_000)
+    return {
+        "GET /dados": lambda a: ("GET", "/dados", None),
+        "GET /dados/buscar": lambda a: ("GET", f"/dados/buscar?nome={a.choice(['queijo', 'burger', 'lasanha', 'suco'])}&limite=10", None),
+        "GET /dados/id/{id}": lambda a: ("GET", f"/dados/id/{a.randint(1, pratos)}", None),
+        "GET /cardapio/combos-diversidade": lambda a: ("GET", f"/cardapio/combos-diversidade?qtd={a.choice([10, 25, 50])}", None),
+        "POST /dados": lambda a: ("POST", "/dados", {"id": next(proximo_id), "nome": "Prato de carga", "preco": round(a.uniform(5, 120), 2), "categoria": a.choice(CATEGORIAS)}),
+    }
+
+
+# Percentil por posição mais próxima em uma lista já ordenada
+def percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    posicao = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[posicao]
+
+
+# Dispara requisições de um cenário com várias threads durante 'duracao' segundos
+def executar_cenario(porta: int, gerar: Callable[[random.Random], Tuple[str, str, Any]], concorrencia: int, duracao: float) -> Dict[str, Any]:
+    latencias: List[float] = []
+    contagem = {"erros": 0, "rejeitadas": 0}
+    trava = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def cliente(semente: int) -> None:
+        aleatorio = random.Random(semente)
+        conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+        minhas: List[float] = []
+        erros = rejeitadas = 0
+        while time.perf_counter() < fim:
+            metodo, caminho, corpo = gerar(aleatorio)
+            cabecalhos = {"Accept-Encoding": "gzip"}
+            dados = None
+            if corpo is not None:
+                dados = json.dumps(corpo).encode("utf-8")
+                cabecalhos["Content-Type"] = "application/json"
+            inicio = time.perf_counter()
+            try:
+                conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                decorrido = time.perf_counter() - inicio
+            except (OSError, http.client.HTTPException):
+                erros += 1
+                conexao.close()
+                conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+                continue
+            if resposta.status == 503:
+                rejeitadas += 1  # Recusada pelo controle de admissão
+            elif resposta.status >= 400:
+                erros += 1
+            else:
+                minhas.append(decorrido)
+        conexao.close()
+        with trava:
+            latencias.extend(minhas)
+            contagem["erros"] += erros
+            contagem["rejeitadas"] += rejeitadas
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    tempo_total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "rps": round(len(latencias) / tempo_total, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "erros": contagem["erros"],
+        "rejeitadas": contagem["rejeitadas"],
+    }
+
+
+# Compara os resultados com a linha de base; devolve a lista de regressões encontradas
+def comparar(resultados: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerancia: float) -> List[str]:
+    regressoes: List[str] = []
+    for cenario, atual in resultados.items():
+        base = baseline.get(cenario)
+        if base is None:
+            continue
+        if atual["rps"] < base["rps"] * (1 - tolerancia):
+            regressoes.append(f"{cenario}: vazão {atual['rps']} req/s < {base['rps']} req/s da linha de base")
+        for chave in ("p95_ms", "p99_ms"):
+            if atual[chave] > base[chave] * (1 + tolerancia):
+                regressoes.append(f"{cenario}: {chave} {atual[chave]} > {base[chave]} da linha de base")
+        if atual["erros"] > base.get("erros", 0):
+            regressoes.append(f"{cenario}: {atual['erros']} erro(s) (linha de base: {base.get('erros', 0)})")
+    return regressoes
+
+
+# Imprime a tabela de resultados
+def imprimir(resultados: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'cenário':<36}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}{'503':>8}")
+    for cenario, r in resultados.items():
+        print(f"{cenario:<36}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['erros']:>8}{r['rejeitadas']:>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP da API do cardápio")
+    parser.add_argument("--pratos", type=int, default=1000, help="Quantidade de pratos do cardápio sintético")
+    parser.add_argument("--concorrencia", type=int, default=16, help="Clientes simultâneos por cenário")
+    parser.add_argument("--duracao", type=float, default=5.0, help="Segundos de carga por cenário")
+    parser.add_argument("--porta", type=int, default=8765, help="Porta local do servidor de teste")
+    parser.add_argument("--cenarios", nargs="*", help="Roda só os cenários indicados (ex.: 'GET /dados')")
+    parser.add_argument("--baseline", type=Path, default=ARQUIVO_BASELINE, help="Arquivo JSON da linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita em relação à linha de base (0.2 = 20%%)")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova linha de base")
+    args = parser.parse_args()
+
+    cenarios = montar_cenarios(args.pratos)
+    if args.cenarios:
+        desconhecidos = [c for c in args.cenarios if c not in cenarios]
+        if desconhecidos:
+            parser.error(f"cenários desconhecidos: {', '.join(desconhecidos)}")
+        cenarios = {c: cenarios[c] for c in args.cenarios}
+    # O POST altera o cardápio e invalida os caches: roda sempre por último para não afetar os demais
+    cenarios = dict(sorted(cenarios.items(), key=lambda par: par[0] == "POST /dados"))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        csv_cardapio = gerar_cardapio(Path(pasta), args.pratos)
+        servidor = iniciar_servidor(csv_cardapio, args.porta)
+        try:
+            resultados = {}
+            for nome, gerar in cenarios.items():
+                print(f"Executando {nome} ({args.concorrencia} clientes, {args.duracao:g}s)...")
+                resultados[nome] = executar_cenario(args.porta, gerar, args.concorrencia, args.duracao)
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=10)
+
+    imprimir(resultados)
+
+    # Os números só são comparáveis com a mesma configuração de carga
+    configuracao = {"pratos": args.pratos, "concorrencia": args.concorrencia, "duracao": args.duracao}
+    if args.salvar_baseline:
+        conteudo = {"configuracao": configuracao, "resultados": resultados}
+        args.baseline.write_text(json.dumps(conteudo, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Linha de base gravada em {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Sem linha de base em {args.baseline}; grave uma com --salvar-baseline")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("configuracao") != configuracao:
+        print(f"A linha de base foi gravada com outra configuração ({baseline.get('configuracao')}); rode com os mesmos parâmetros")
+        return 2
+
+    regressoes = comparar(resultados, baseline["resultados"], args.tolerancia)
+    if regressoes:
+        print("Regressões em relação à linha de base:")
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        return 1
+    print("Sem regressões em relação à linha de base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())